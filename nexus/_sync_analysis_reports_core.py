@@ -0,0 +1,86 @@
+"""Core helpers for sync_analysis_reports: conversation loading, digests, API runs."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+_DATA_DIR = Path(os.environ.get("NEXUS_DATA_DIR", "~/.nexus/data")).expanduser()
+
+
+def load_conversations(data_dir: Path | None = None) -> List[Dict]:
+    """Load every conversation JSON file under the data directory."""
+    base = data_dir or _DATA_DIR
+    conversations = []
+    if not base.is_dir():
+        return conversations
+    for fpath in sorted(base.glob("*.json")):
+        with open(fpath, "r", encoding="utf-8") as fh:
+            conversations.append(json.load(fh))
+    return conversations
+
+
+def build_session_digest(conv: Dict) -> Dict:
+    """Reduce a full conversation to the compact digest the analysis run consumes."""
+    turns = conv.get("turns", [])
+    # Claude Code sessions carry a language per turn; ChatGPT sessions only
+    # record the conversation-level call in metadata. Fall back to it so
+    # neither source produces an empty list.
+    languages = sorted({t.get("language", "") for t in turns if t.get("language")})
+    if not languages:
+        meta_language = conv.get("metadata", {}).get("language", "")
+        if meta_language:
+            languages = [meta_language]
+    return {
+        "session_id": conv.get("session_id", ""),
+        "source": conv.get("source", ""),
+        "title": conv.get("title", ""),
+        "created_at": conv.get("created_at", ""),
+        "num_turns": len(turns),
+        "languages": languages,
+        "first_user_message": (turns[0].get("user_message", {}).get("content", "")[:500] if turns else ""),
+    }
+
+
+def run_api(digests: List[Dict], result_path: Path) -> None:
+    """Run the analysis pass over session digests and write the raw result file."""
+    sessions = []
+    for digest in digests:
+        sessions.append({
+            "session_id": digest.get("session_id", ""),
+            "created_at": digest.get("created_at", ""),
+            "mechanism": {
+                "num_turns": digest.get("num_turns", 0),
+                "languages": digest.get("languages", []),
+            },
+        })
+    result_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(result_path, "w", encoding="utf-8") as fh:
+        json.dump({"sessions": sessions}, fh, ensure_ascii=False, indent=2)
+
+
+def run_incremental_api(records: List[Dict], result_path: Path) -> None:
+    """Run the incremental analysis pass over already-validated sidecar records."""
+    result_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(result_path, "w", encoding="utf-8") as fh:
+        json.dump({"sessions": records}, fh, ensure_ascii=False, indent=2)
+
+
+def sync_reports_from_incremental(records: List[Dict], run_dir: Path) -> int:
+    """Materialize per-period report stubs from incremental records; returns count."""
+    by_period: Dict[str, List[Dict]] = {}
+    for rec in records:
+        by_period.setdefault(rec.get("period_id", "unknown"), []).append(rec)
+    reports_dir = run_dir / "reports"
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    for period_id, period_records in sorted(by_period.items()):
+        out = reports_dir / f"{period_id}.json"
+        with open(out, "w", encoding="utf-8") as fh:
+            json.dump({
+                "period_id": period_id,
+                "num_sessions": len(period_records),
+                "session_ids": [r.get("session_id", "") for r in period_records],
+            }, fh, ensure_ascii=False, indent=2)
+    return len(by_period)
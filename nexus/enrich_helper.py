@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+"""Helper CLI for enriching exported conversations with LLM metadata.
+
+Conversations live as one JSON file per session under the data dir. The
+enrichment loop is: `status` / `list` to see what is missing, `digest` /
+`batch-digest` to produce compact summaries for the LLM, then `write` /
+`batch-write` to attach the returned metadata under metadata.llm_metadata.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
+DATA_DIR = Path(os.environ.get("NEXUS_DATA_DIR", "~/.nexus/data")).expanduser()
+
+_REQUIRED_FIELDS = {
+    "task_type": str,
+    "outcome": str,
+    "difficulty": int,
+    "prompt_quality": int,
+    "summary": str,
+}
+_VALID_TASK_TYPES = frozenset({"coding", "debugging", "writing", "research", "analysis", "config", "other"})
+_VALID_OUTCOMES = frozenset({"solved", "partial", "unsolved", "abandoned"})
+
+# Flattened once at import so validation is a single pass over a tuple:
+# (field, type, allowed value set or None, 1-5 range check).
+_SCHEMA = tuple(
+    (field, typ,
+     _VALID_TASK_TYPES if field == "task_type" else _VALID_OUTCOMES if field == "outcome" else None,
+     field in ("difficulty", "prompt_quality"))
+    for field, typ in _REQUIRED_FIELDS.items()
+)
+
+
+def _json_loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumpb(obj, indent: Optional[int] = None) -> bytes:
+    # orjson emits UTF-8 bytes directly; writing those through a binary file
+    # handle skips the TextIOWrapper encode pass entirely.
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=indent).encode("utf-8")
+
+
+def _load_json_file(fpath) -> Dict:
+    """Parse a JSON file through mmap: the OS pages the bytes in on demand
+    and no full-file copy lands in a Python bytes object first.
+
+    Falls back to a plain read for empty files or filesystems that refuse
+    mmap; the stdlib-json fallback also copies, since json.loads needs
+    bytes/str.
+    """
+    with open(fpath, "rb") as fh:
+        try:
+            buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return _json_loads(fh.read())
+        try:
+            if orjson is not None:
+                view = memoryview(buf)
+                try:
+                    return orjson.loads(view)
+                finally:
+                    view.release()
+            return json.loads(buf[:])
+        finally:
+            buf.close()
+
+
+_ENRICH_INDEX_PATH = DATA_DIR / ".enrich_index.json"
+
+
+def _load_enrich_index() -> Dict[str, Dict]:
+    try:
+        index = _json_loads(_ENRICH_INDEX_PATH.read_bytes())
+        if isinstance(index, dict):
+            return index
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def _scan_json_entries() -> List[os.DirEntry]:
+    """List conversation files as DirEntry objects, sorted by name.
+
+    scandir fills name/type (and on most platforms the stat result) from the
+    directory read itself, so filtering out non-.json entries costs no extra
+    stat syscall per file.
+    """
+    with os.scandir(DATA_DIR) as it:
+        entries = [
+            e for e in it
+            if e.name.endswith(".json") and not e.name.startswith(".") and e.is_file()
+        ]
+    entries.sort(key=lambda e: e.name)
+    return entries
+
+
+def _iter_conversations(return_conv: bool = False) -> List[Dict]:
+    """Scan the data dir and summarize every conversation file.
+
+    Summaries are cached in data/.enrich_index.json keyed by (mtime, size),
+    so repeat scans only re-parse files that actually changed. With
+    return_conv=True each summary also carries the parsed conversation under
+    "_conv" so callers that need the full payload (batch-digest) don't
+    re-open and re-parse every file (those always parse).
+    """
+    results = []
+    if not DATA_DIR.is_dir():
+        return results
+    index = _load_enrich_index()
+    index_dirty = False
+    for entry in _scan_json_entries():
+        fname = entry.name
+        fpath = entry.path
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        cached = index.get(fpath)
+        if (not return_conv and cached
+                and cached.get("mtime") == st.st_mtime
+                and cached.get("size") == st.st_size):
+            summary = dict(cached["summary"])
+            summary["fpath"] = fpath
+            results.append(summary)
+            continue
+        try:
+            conv = _load_json_file(fpath)
+        except (OSError, ValueError):
+            continue
+        metadata = conv.get("metadata", {}) or {}
+        summary = {
+            "fpath": fpath,
+            "session_id": conv.get("session_id", fname[:-5]),
+            "source": conv.get("source", ""),
+            "title": conv.get("title", ""),
+            "turns": len(conv.get("turns", [])),
+            "enriched": bool(metadata.get("llm_metadata")),
+        }
+        index[fpath] = {
+            "mtime": st.st_mtime,
+            "size": st.st_size,
+            "summary": {k: v for k, v in summary.items() if k != "fpath"},
+        }
+        index_dirty = True
+        if return_conv:
+            summary["_conv"] = conv
+        results.append(summary)
+    if index_dirty:
+        try:
+            _ENRICH_INDEX_PATH.write_bytes(_json_dumpb(index))
+        except OSError:
+            pass
+    return results
+
+
+def _find_str_value(buf, key: bytes) -> Optional[str]:
+    """Extract the string value following '"key":' with byte searches.
+
+    Returns None when the key is absent or the value needs real JSON parsing
+    (escapes, non-string), so callers can fall back to a full parse.
+    """
+    pos = buf.find(b'"%s"' % key)
+    if pos < 0:
+        return None
+    pos = buf.find(b":", pos + len(key) + 2)
+    if pos < 0:
+        return None
+    pos += 1
+    while pos < len(buf) and buf[pos : pos + 1] in b" \t\r\n":
+        pos += 1
+    if buf[pos : pos + 1] != b'"':
+        return None
+    end = buf.find(b'"', pos + 1)
+    if end < 0:
+        return None
+    raw = buf[pos + 1 : end]
+    if b"\\" in raw:
+        return None
+    return raw.decode("utf-8", errors="replace")
+
+
+def _count_occurrences(buf, needle: bytes) -> int:
+    """mmap objects lack bytes.count; chain find() without copying the buffer."""
+    count = 0
+    pos = buf.find(needle)
+    while pos >= 0:
+        count += 1
+        pos = buf.find(needle, pos + len(needle))
+    return count
+
+
+def _quick_scan(fpath: str) -> Optional[Dict]:
+    """Summarize a conversation file without decoding it into PyObjects.
+
+    mmaps the file and pulls the handful of fields status/list need via byte
+    searches; returns None on any ambiguity so the caller can full-parse.
+    """
+    try:
+        with open(fpath, "rb") as fh:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                session_id = _find_str_value(buf, b"session_id")
+                source = _find_str_value(buf, b"source")
+                title = _find_str_value(buf, b"title")
+                if session_id is None or source is None or title is None:
+                    return None
+                return {
+                    "fpath": fpath,
+                    "session_id": session_id,
+                    "source": source,
+                    "title": title,
+                    "turns": _count_occurrences(buf, b'"user_message"'),
+                    "enriched": buf.find(b'"llm_metadata"') >= 0,
+                }
+    except (OSError, ValueError):
+        return None
+
+
+def _scan_conversations() -> List[Dict]:
+    """Fast-path summaries for status/list: quick scan, full parse on demand."""
+    results = []
+    if not DATA_DIR.is_dir():
+        return results
+    fallback_paths = []
+    for entry in _scan_json_entries():
+        summary = _quick_scan(entry.path)
+        if summary is None:
+            fallback_paths.append(entry.path)
+        else:
+            results.append(summary)
+    if fallback_paths:
+        by_path = {c["fpath"]: c for c in _iter_conversations()}
+        results.extend(by_path[p] for p in fallback_paths if p in by_path)
+        results.sort(key=lambda c: c["fpath"])
+    return results
+
+
+def _load_conversation(session_id: str) -> Tuple[Optional[str], Optional[Dict]]:
+    fpath = DATA_DIR / f"{session_id}.json"
+    if not fpath.is_file():
+        return None, None
+    return str(fpath), _load_json_file(fpath)
+
+
+def _build_fast_validator():
+    """Unroll _SCHEMA into a straight-line validator at import time.
+
+    Each field's checks become dedicated bytecode with its type object and
+    allowed-value set bound as globals of the generated function — no tuple
+    unpacking or schema iteration per call.
+    """
+    ns: Dict = {}
+    lines = ["def _v(data, errs):"]
+    for i, (field, typ, allowed, ranged) in enumerate(_SCHEMA):
+        type_name = f"_t{i}"
+        ns[type_name] = typ
+        lines.append(f"    v = data.get({field!r})")
+        lines.append(f"    if v is None: errs.append('missing field: {field}')")
+        lines.append(f"    elif not isinstance(v, {type_name}): "
+                     f"errs.append('{field}: expected {typ.__name__}, got ' + type(v).__name__)")
+        if allowed is not None:
+            allowed_name = f"_a{i}"
+            ns[allowed_name] = allowed
+            lines.append(f"    elif v not in {allowed_name}: "
+                         f"errs.append('{field}: unknown value ' + repr(v))")
+        if ranged:
+            lines.append(f"    elif not 1 <= v <= 5: errs.append('{field}: must be 1-5')")
+    exec("\n".join(lines), ns)
+    return ns["_v"]
+
+
+_validate_fast = _build_fast_validator()
+
+
+def _validate_llm_data(data: Dict) -> List[str]:
+    if not isinstance(data, dict):
+        return ["llm_data is not an object"]
+    errors: List[str] = []
+    _validate_fast(data, errors)
+    return errors
+
+
+_DIGEST_HEADER_TMPL = (
+    "=== {title} ===\n"
+    "Source: {source} | Model: {model} | Date: {created}\n"
+    "Turns: {turns} | Language: {lang}\n"
+    "Detected domains: {domains}"
+)
+_DIGEST_TURN_TMPL = "[turn {i}] {content}"
+
+
+def build_conversation_digest(conv: Dict) -> str:
+    """Render the compact plain-text digest handed to the LLM."""
+    turns = conv.get("turns", [])
+    metadata = conv.get("metadata", {}) or {}
+    tool_counts = Counter(
+        tn
+        for turn in turns
+        for tu in turn.get("assistant_response", {}).get("tool_uses", [])
+        if (tn := tu.get("tool_name", ""))
+    )
+    # most_common(n) delegates to heapq.nlargest, so the top five fall out in
+    # O(N log 5) without sorting the whole tally.
+    top_tools = tool_counts.most_common(5)
+
+    parts = [_DIGEST_HEADER_TMPL.format(
+        title=conv.get("title", "untitled"),
+        source=conv.get("source", "?"),
+        model=metadata.get("model", "?"),
+        created=conv.get("created_at", "?"),
+        turns=len(turns),
+        lang=metadata.get("language", "?"),
+        domains=", ".join(metadata.get("domains", [])) or "-",
+    )]
+    if top_tools:
+        parts.append("Top tools: " + ", ".join(f"{name}({count})" for name, count in top_tools))
+    parts.append("")
+
+    turn_dicts = [
+        {"i": i, "content": turn.get("user_message", {}).get("content", "")[:200]}
+        for i, turn in enumerate(turns[:3])
+    ]
+    if len(turns) > 3:
+        turn_dicts.append({
+            "i": len(turns) - 1,
+            "content": turns[-1].get("user_message", {}).get("content", "")[:200],
+        })
+    if turn_dicts:
+        parts.append("\n".join(map(_DIGEST_TURN_TMPL.format_map, turn_dicts)))
+    return "\n".join(parts)
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    conversations = _scan_conversations()
+    by_source: Dict[str, List[int]] = {}
+    for c in conversations:
+        bucket = by_source.setdefault(c["source"] or "?", [0, 0])
+        bucket[0] += 1
+        if c["enriched"]:
+            bucket[1] += 1
+    total = len(conversations)
+    enriched = sum(1 for c in conversations if c["enriched"])
+    print(f"conversations: {total} total, {enriched} enriched, {total - enriched} pending")
+    for source, (n, n_enriched) in sorted(by_source.items()):
+        print(f"  {source}: {n_enriched}/{n}")
+    return 0
+
+
+def cmd_list(args: argparse.Namespace) -> int:
+    conversations = _scan_conversations()
+    if args.pending:
+        conversations = [c for c in conversations if not c["enriched"]]
+    for c in conversations:
+        mark = "*" if c["enriched"] else " "
+        print(f"{mark} {c['session_id']}  turns={c['turns']:<4d} [{c['source']}] {c['title'][:60]}")
+    return 0
+
+
+def cmd_digest(args: argparse.Namespace) -> int:
+    fpath, conv = _load_conversation(args.session_id)
+    if conv is None:
+        print(f"not found: {args.session_id}", file=sys.stderr)
+        return 1
+    print(build_conversation_digest(conv))
+    return 0
+
+
+def cmd_batch_digest(args: argparse.Namespace) -> int:
+    conversations = _iter_conversations(return_conv=True)
+    if args.pending:
+        conversations = [c for c in conversations if not c["enriched"]]
+    if args.limit:
+        conversations = conversations[: args.limit]
+    # Stream each record to stdout as it is built instead of accumulating the
+    # whole result list: peak memory stays at one record and consumers piped
+    # downstream see output immediately.
+    out = sys.stdout.buffer
+    out.write(b"[\n")
+    first_record = True
+    for c in conversations:
+        conv = c["_conv"]
+        turns = conv.get("turns", [])
+        # Single pass over the turns: corrections and tool dedup together,
+        # so each turn dict is only visited once.
+        tool_names: List[str] = []
+        seen: set = set()
+        corr_count = 0
+        for turn in turns:
+            if turn.get("user_message", {}).get("corrections"):
+                corr_count += 1
+            for tu in turn.get("assistant_response", {}).get("tool_uses", []):
+                tn = tu.get("tool_name", "")
+                if tn and tn not in seen:
+                    seen.add(tn)
+                    tool_names.append(tn)
+        first = turns[0].get("user_message", {}).get("content", "")[:300] if turns else ""
+        last = turns[-1].get("user_message", {}).get("content", "")[:300] if turns else ""
+        if not first_record:
+            out.write(b",\n")
+        out.write(_json_dumpb({
+            "session_id": c["session_id"],
+            "title": conv.get("title", ""),
+            "turns": len(turns),
+            "tools": tool_names[:10],
+            "corrections": corr_count,
+            "first": first,
+            "last": last,
+        }))
+        first_record = False
+    out.write(b"\n]\n")
+    out.flush()
+    return 0
+
+
+def _attach_llm_metadata(conv: Dict, llm_data: Dict, extracted_at: str) -> None:
+    metadata = conv.setdefault("metadata", {})
+    metadata["llm_metadata"] = dict(llm_data)
+    metadata["llm_metadata"]["extracted_at"] = extracted_at
+
+
+def cmd_write(args: argparse.Namespace) -> int:
+    llm_data = _json_loads(args.json if args.json else Path(args.json_file).read_bytes())
+    errors = _validate_llm_data(llm_data)
+    if errors:
+        for err in errors:
+            print(f"invalid llm_data: {err}", file=sys.stderr)
+        return 1
+    fpath, conv = _load_conversation(args.session_id)
+    if conv is None:
+        print(f"not found: {args.session_id}", file=sys.stderr)
+        return 1
+    _attach_llm_metadata(conv, llm_data, datetime.now(timezone.utc).isoformat())
+    indent = None if args.compact else 2
+    with open(fpath, "wb") as fh:
+        fh.write(_json_dumpb(conv, indent=indent))
+    print(f"wrote llm_metadata for {args.session_id}")
+    return 0
+
+
+def _apply_one(session_id: str, llm_data: Dict, indent: Optional[int], extracted_at: str) -> Tuple[bool, Optional[str]]:
+    """Validate and write one session's llm_data; returns (ok, error message)."""
+    errors = _validate_llm_data(llm_data)
+    if errors:
+        return False, f"{session_id}: {'; '.join(errors)}"
+    fpath = DATA_DIR / f"{session_id}.json"
+    try:
+        # One descriptor for the whole read-modify-write: read, parse,
+        # rewind, truncate, write back.
+        with open(fpath, "r+b") as fh:
+            conv = _json_loads(fh.read())
+            _attach_llm_metadata(conv, llm_data, extracted_at)
+            fh.seek(0)
+            fh.truncate()
+            fh.write(_json_dumpb(conv, indent=indent))
+    except FileNotFoundError:
+        return False, f"{session_id}: not found"
+    except ValueError:
+        return False, f"{session_id}: unreadable JSON"
+    return True, None
+
+
+def cmd_batch_write(args: argparse.Namespace) -> int:
+    batch_data = _json_loads(Path(args.batch_file).read_bytes())
+    if not isinstance(batch_data, dict):
+        print("batch file must map session_id -> llm_data", file=sys.stderr)
+        return 1
+    indent = None if args.compact else 2
+    # One timestamp for the whole batch: it is a single enrichment pass, and
+    # per-session datetime.now calls buy nothing but overhead.
+    extracted_at = datetime.now(timezone.utc).isoformat()
+    # Each item is an independent read/mutate/write — I/O-bound work that
+    # overlaps well on threads. ex.map keeps results in submission order so
+    # output stays deterministic.
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 8) * 4)) as ex:
+        results = list(ex.map(lambda kv: _apply_one(kv[0], kv[1], indent, extracted_at), batch_data.items()))
+    ok = 0
+    failed = 0
+    for success, message in results:
+        if success:
+            ok += 1
+        else:
+            failed += 1
+            print(f"  ! {message}", file=sys.stderr)
+    print(f"batch-write: {ok} written, {failed} failed")
+    return 0 if failed == 0 else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="enrich_helper", description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_status = sub.add_parser("status", help="enrichment counts by source")
+    p_status.set_defaults(func=cmd_status)
+
+    p_list = sub.add_parser("list", help="list conversations")
+    p_list.add_argument("--pending", action="store_true", help="only unenriched")
+    p_list.set_defaults(func=cmd_list)
+
+    p_digest = sub.add_parser("digest", help="print one conversation digest")
+    p_digest.add_argument("session_id")
+    p_digest.set_defaults(func=cmd_digest)
+
+    p_bd = sub.add_parser("batch-digest", help="JSON digests for many conversations")
+    p_bd.add_argument("--pending", action="store_true", help="only unenriched")
+    p_bd.add_argument("--limit", type=int, default=0)
+    p_bd.set_defaults(func=cmd_batch_digest)
+
+    p_write = sub.add_parser("write", help="attach llm_metadata to one conversation")
+    p_write.add_argument("session_id")
+    group = p_write.add_mutually_exclusive_group(required=True)
+    group.add_argument("--json", help="llm_data as an inline JSON string")
+    group.add_argument("--json-file", help="path to a JSON file with llm_data")
+    p_write.add_argument("--compact", action="store_true", help="write without indentation")
+    p_write.set_defaults(func=cmd_write)
+
+    p_bw = sub.add_parser("batch-write", help="attach llm_metadata from a batch file")
+    p_bw.add_argument("batch_file", help="JSON file mapping session_id -> llm_data")
+    p_bw.add_argument("--compact", action="store_true", help="write without indentation")
+    p_bw.set_defaults(func=cmd_batch_write)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Ordering helpers for incremental analysis reports.
+
+Reports are grouped by a small fixed set of dimensions; everything here keeps
+that ordering logic in one place so report lists sort the same way across
+commands.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+DIMENSION_ORDER = (
+    "productivity",
+    "tooling",
+    "languages",
+    "domains",
+    "corrections",
+    "quality",
+)
+
+DIMENSION_ORDER_INDEX: Dict[str, int] = {d: i for i, d in enumerate(DIMENSION_ORDER)}
+_UNKNOWN_RANK = len(DIMENSION_ORDER)
+
+
+def _norm(dimension) -> str:
+    # Inputs are normally already-clean strs; avoid str() coercion and only
+    # strip when there is something to strip.
+    return dimension.strip() if isinstance(dimension, str) else ""
+
+
+def dimension_sort_key(dimension) -> int:
+    return DIMENSION_ORDER_INDEX.get(_norm(dimension), _UNKNOWN_RANK)
+
+
+def report_sort_key(report: Dict) -> Tuple[int, str, str, str]:
+    return (
+        DIMENSION_ORDER_INDEX.get(_norm(report.get("dimension")), _UNKNOWN_RANK),
+        report.get("period_id", ""),
+        report.get("date", ""),
+        report.get("title", ""),
+    )
+
+
+def sort_reports(reports: List[Dict]) -> List[Dict]:
+    """Sort reports by (dimension rank, period, date, title).
+
+    Decorate-sort-undecorate: the key is computed once per report instead of
+    per comparison, and the sort itself compares plain tuples.
+    """
+    decorated = [(report_sort_key(report), i, report) for i, report in enumerate(reports)]
+    decorated.sort()
+    return [report for _, _, report in decorated]
@@ -0,0 +1,1063 @@
+#!/usr/bin/env python3
+"""Import a ChatGPT data export into the Notion conversations database.
+
+Reads conversations.json from an unpacked export, flattens each conversation's
+message-mapping tree into ordered user/assistant turns, enriches them with
+cheap heuristics (language, domains, corrections), saves a local JSON copy per
+session, and creates one Notion page per conversation. Already-imported
+sessions (matched by session id) are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional accelerator
+    ahocorasick = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional accelerator
+    np = None
+
+try:
+    # The yajl2_c backend tokenizes in C; the pure-Python backend parses an
+    # order of magnitude slower.
+    import ijson.backends.yajl2_c as ijson
+except ImportError:  # pragma: no cover - optional streaming parser
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - optional accelerator
+    numba = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
+try:
+    import blake3
+except ImportError:  # pragma: no cover - optional accelerator
+    blake3 = None
+
+try:
+    # Rate-limited redraws (10 Hz) instead of one stdout flush per
+    # conversation; also gives an ETA on large batches.
+    from tqdm import tqdm
+except ImportError:  # pragma: no cover - optional progress bar
+    tqdm = None
+
+DATA_DIR = Path(os.environ.get("NEXUS_DATA_DIR", "~/.nexus/data")).expanduser()
+
+NOTION_API_BASE = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+
+# Notion rich_text content is capped at 2000 UTF-16 code units per block.
+NOTION_TEXT_LIMIT = 2000
+NOTION_CHILDREN_LIMIT = 100
+
+# Below this many conversations the process pool costs more than it saves.
+_PARALLEL_MIN_ITEMS = 64
+
+# Notion allows ~3 requests/second per integration token; more upload
+# workers than that would only queue behind the limiter.
+_NOTION_REQS_PER_SEC = 3
+_NOTION_MAX_WORKERS = 3
+
+# Exponential backoff for rate-limited/transient Notion errors; the
+# Retry-After header wins over the computed delay when the server sends one.
+_RETRY_MAX_ATTEMPTS = 5
+_RETRY_BASE_DELAY = 1.0
+_RETRY_MAX_DELAY = 32.0
+
+_UTC = timezone.utc
+
+DOMAIN_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "web-dev": (
+        "react", "vue", "svelte", "nextjs", "next.js", "frontend", "css",
+        "html", "tailwind", "webpack", "vite", "dom", "javascript",
+        "typescript", "browser",
+    ),
+    "backend": (
+        "fastapi", "django", "flask", "express", "api endpoint", "rest api",
+        "graphql", "microservice", "server", "nginx", "websocket", "grpc",
+    ),
+    "data": (
+        "pandas", "numpy", "dataframe", "sql", "postgres", "sqlite",
+        "etl", "data pipeline", "csv", "parquet", "matplotlib", "jupyter",
+    ),
+    "ml": (
+        "pytorch", "tensorflow", "machine learning", "neural network",
+        "training loop", "embedding", "transformer", "fine-tune", "llm",
+        "prompt engineering", "inference",
+    ),
+    "devops": (
+        "docker", "kubernetes", "terraform", "ci/cd", "github actions",
+        "deploy", "ansible", "aws", "gcp", "helm", "prometheus",
+    ),
+    "systems": (
+        "rust", "c++", "golang", "memory leak", "segfault", "syscall",
+        "profiling", "perf", "multithread", "mutex", "race condition",
+    ),
+    "scripting": (
+        "bash", "shell script", "cron", "regex", "awk", "sed",
+        "automation", "cli tool", "argparse",
+    ),
+    "writing": (
+        "essay", "blog post", "translate", "proofread", "rewrite",
+        "summarize", "email draft", "resume", "cover letter",
+    ),
+}
+
+
+def _build_domain_automaton():
+    """Build one Aho–Corasick automaton over every domain keyword.
+
+    A single linear scan of the text then replaces one substring search per
+    keyword. Returns None when pyahocorasick is not installed; _match_domains
+    falls back to the per-keyword scan.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for domain, keywords in DOMAIN_KEYWORDS.items():
+        for kw in keywords:
+            automaton.add_word(kw, domain)
+    automaton.make_automaton()
+    return automaton
+
+
+_DOMAIN_AC = _build_domain_automaton()
+
+
+def _build_keyword_index() -> Dict[str, Tuple[Tuple[str, str], ...]]:
+    """Invert DOMAIN_KEYWORDS by first character for the fallback matcher.
+
+    Sliding over the text and only testing keywords that start with the
+    current character approximates the automaton's one-pass behaviour
+    without the dependency: each position considers a handful of candidates
+    instead of the whole keyword list.
+    """
+    by_first: Dict[str, List[Tuple[str, str]]] = {}
+    for domain, keywords in DOMAIN_KEYWORDS.items():
+        for kw in keywords:
+            by_first.setdefault(kw[0], []).append((kw, domain))
+    return {c: tuple(pairs) for c, pairs in by_first.items()}
+
+
+_KW_BY_FIRST = _build_keyword_index() if _DOMAIN_AC is None else {}
+
+CORRECTION_PATTERNS: Tuple[Dict[str, str], ...] = (
+    {"type": "factual", "indicator": r"^no[,.\s]"},
+    {"type": "factual", "indicator": r"\bthat'?s (?:wrong|incorrect|not right)\b"},
+    {"type": "factual", "indicator": r"\bactually[,\s]"},
+    {"type": "intent", "indicator": r"\bi meant\b"},
+    {"type": "intent", "indicator": r"\bthat'?s not what i\b"},
+    {"type": "intent", "indicator": r"\bi was asking\b"},
+    {"type": "style", "indicator": r"\btoo (?:long|short|verbose|formal)\b"},
+    {"type": "style", "indicator": r"\bmake it (?:shorter|longer|simpler)\b"},
+    {"type": "style", "indicator": r"\bin (?:english|chinese|japanese) please\b"},
+    {"type": "code", "indicator": r"\b(?:doesn'?t|does not|didn'?t) (?:work|run|compile)\b"},
+    {"type": "code", "indicator": r"\bstill (?:get|getting|throws?) (?:an? )?error\b"},
+    {"type": "code", "indicator": r"\bsame error\b"},
+    {"type": "retry", "indicator": r"\btry again\b"},
+    {"type": "retry", "indicator": r"\bregenerate\b"},
+)
+
+_TOOL_NAME_MAP = {
+    "python": "Code Interpreter",
+    "browser": "Web Browsing",
+    "web.run": "Web Browsing",
+    "web": "Web Browsing",
+    "dalle.text2im": "DALL-E",
+    "dalle": "DALL-E",
+    "bio": "Memory",
+    "canmore": "Canvas",
+    "myfiles_browser": "File Browser",
+}
+
+
+def _match_domains(lower: str) -> List[str]:
+    if _DOMAIN_AC is not None:
+        matched = {domain for _, domain in _DOMAIN_AC.iter(lower)}
+        return sorted(matched) or ["other"]
+    matched = set()
+    index = _KW_BY_FIRST
+    for i, c in enumerate(lower):
+        for kw, domain in index.get(c, ()):
+            if domain not in matched and lower.startswith(kw, i):
+                matched.add(domain)
+    return sorted(matched) or ["other"]
+
+
+# All correction indicators fused into one alternation so a message is walked
+# by a single compiled regex instead of one re.search per pattern. Group c<i>
+# maps back to CORRECTION_PATTERNS[i]. The alternation sits inside a
+# zero-width lookahead: a plain alternation consumes its match, so an
+# indicator starting inside another's span ("that's not what i meant" hits
+# both "that's not what i" and "i meant") would be skipped; the lookahead
+# matches at every start position, like the per-pattern scans did. The
+# indicators are all lowercase ASCII, so matching a lowercased copy of the
+# message replaces IGNORECASE — which roughly doubles the compiled
+# automaton's states and slows every scan.
+_CORRECTION_RE = re.compile(
+    "(?="
+    + "|".join(f"(?P<c{i}>{p['indicator']})" for i, p in enumerate(CORRECTION_PATTERNS))
+    + ")",
+)
+
+
+def detect_corrections(text: str) -> List[Dict[str, str]]:
+    """Find user-correction signals in one user message."""
+    # "ok"/"thanks"-length acknowledgements are the most common user message;
+    # the shortest indicator ("no,") needs three characters.
+    if len(text) < 3:
+        return []
+    lower = text if text.islower() else text.lower()
+    hit_indices = {int(m.lastgroup[1:]) for m in _CORRECTION_RE.finditer(lower)}
+    return [
+        {"type": p["type"], "indicator": p["indicator"]}
+        for i, p in enumerate(CORRECTION_PATTERNS)
+        if i in hit_indices
+    ]
+
+
+_CJK_RE = re.compile("[一-鿿]")
+# Below this size the utf-32 encode for the vectorized path costs more than
+# it saves; the regex scan is already C-level.
+_CJK_NUMPY_MIN_CHARS = 512
+
+
+if numba is not None and np is not None:
+    @numba.njit(cache=True, fastmath=True, boundscheck=False)
+    def _cjk_count_arr(arr):  # pragma: no cover - needs numba
+        # Plain range loop (not enumerate) so LLVM autovectorizes the
+        # reduction; cache=True amortizes the first-run compile.
+        count = 0
+        for i in range(arr.shape[0]):
+            x = arr[i]
+            if 0x4E00 <= x <= 0x9FFF:
+                count += 1
+        return count
+else:
+    _cjk_count_arr = None
+
+
+def _cjk_count(text: str) -> int:
+    """Count CJK codepoints; one vectorized range test on long strings."""
+    if np is not None and len(text) > _CJK_NUMPY_MIN_CHARS:
+        arr = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        if _cjk_count_arr is not None:
+            return int(_cjk_count_arr(arr))
+        return int(((arr >= 0x4E00) & (arr <= 0x9FFF)).sum())
+    return len(_CJK_RE.findall(text))
+
+
+_LATIN_WORD_RE = re.compile(r"[a-zA-Z0-9]+")
+
+
+def _analyse_user_text(text: str) -> Tuple[str, List[str], int]:
+    """One fused pass over the aggregated user text.
+
+    Language (crude CJK-vs-Latin call), topic domains and an approximate
+    word count (CJK chars count one each, the rest as latin runs) used to
+    be separate helpers that each walked the same string; here the
+    lowercase copy and the CJK tally are computed once and shared, so the
+    text is traversed three times less.
+    """
+    if not text:
+        return "unknown", ["other"], 0
+    lower = text.lower()
+    cjk = _cjk_count(lower)
+    language = "zh" if cjk > len(text) * 0.05 else "en"
+    words = cjk + len(_LATIN_WORD_RE.findall(lower))
+    return language, _match_domains(lower), words
+
+
+@functools.lru_cache(maxsize=None)
+def _normalise_tool_name(raw: Optional[str]) -> str:
+    """Map a raw ChatGPT recipient/tool name onto a human-readable label.
+
+    Tool-name cardinality across a dump is tiny while call volume is one per
+    tool message, so the cache turns the string munging into a dict hit.
+    """
+    if not raw:
+        return "Unknown Tool"
+    name = raw
+    if "__jit_plugin" in name:
+        name = name.partition("__jit_plugin")[0].rpartition(".")[2]
+    base = name.partition(".")[0]
+    if name in _TOOL_NAME_MAP:
+        return _TOOL_NAME_MAP[name]
+    if base in _TOOL_NAME_MAP:
+        return _TOOL_NAME_MAP[base]
+    return name
+
+
+# Compiled once at import; re.search with a literal pattern re-hits the
+# module cache (a dict lookup plus lock) on every call.
+_CODE_RE = re.compile(r"`[^`]+`")
+_FILE_RE = re.compile(r"[/\\][\w.\-]+(?:[/\\][\w.\-]+)+")
+
+
+def _has_code(text: str) -> bool:
+    # Fenced blocks are the common positive; the substring check settles
+    # them before the regex engine starts. An inline span needs at least
+    # `x`.
+    if len(text) < 3:
+        return False
+    if "```" in text:
+        return True
+    return _CODE_RE.search(text) is not None
+
+
+def _has_file_reference(text: str) -> bool:
+    # The pattern needs at least /x/y.
+    if len(text) < 4:
+        return False
+    return _FILE_RE.search(text) is not None
+
+
+def truncate(text: str, max_len: int = NOTION_TEXT_LIMIT) -> str:
+    """Trim text to at most max_len UTF-16 code units (the Notion cap).
+
+    One encode, one byte slice, one decode: code units are 2 bytes each in
+    UTF-16-LE, so the cut point is plain arithmetic. If the cut lands after
+    a high surrogate the pair is dropped whole so the decode stays valid.
+    """
+    if text.isascii():
+        if len(text) <= max_len:
+            return text
+        return text[: max_len - 3] + "..."
+    encoded = text.encode("utf-16-le")
+    if len(encoded) <= 2 * max_len:
+        return text
+    trimmed = encoded[: 2 * (max_len - 3)]
+    if trimmed and trimmed[-1] & 0xFC == 0xD8:
+        trimmed = trimmed[:-2]
+    return trimmed.decode("utf-16-le") + "..."
+
+
+@functools.lru_cache(maxsize=8192)
+def unix_to_iso(ts: Optional[float]) -> str:
+    # Called per turn and per conversation; timestamps recur heavily within
+    # a conversation, so most calls are cache hits on the formatted string.
+    if ts is None:
+        return ""
+    return datetime.fromtimestamp(ts, tz=_UTC).isoformat()
+
+
+_ASSIST_TOOL_ROLES = frozenset({"assistant", "tool"})
+
+
+def flatten_mapping(mapping: Dict[str, Dict]) -> List[Dict]:
+    """Flatten the export's message-mapping tree into ordered turns.
+
+    ChatGPT stores each conversation as a tree (edits create branches); the
+    canonical transcript is the walk from the root through each node's first
+    listed child. Messages are then paired into turns: one user message plus
+    the assistant/tool messages that answer it.
+    """
+    # Remap node ids (36-char UUIDs) to dense ints up front: the walk then
+    # indexes a list and flips a bytearray bit per step instead of hashing
+    # UUID strings into a set, and each child id is hashed exactly once.
+    idx_of = {node_id: i for i, node_id in enumerate(mapping)}
+    nodes = list(mapping.values())
+
+    root_idx: Optional[int] = None
+    for i, node in enumerate(nodes):
+        if not node.get("parent"):
+            root_idx = i
+            break
+    if root_idx is None:
+        return []
+
+    # The walk and pairing below run once per message over potentially
+    # thousands of messages; locals are bound outside the loops so the hot
+    # path is list indexing and appends, not repeated global/method lookups.
+    # Messages are kept as parallel per-field lists (structure of arrays)
+    # rather than one dict per message: the pairing pass reads roles far more
+    # often than the other fields, and indexed list loads replace a dict hash
+    # per field access.
+    roles: List[str] = []
+    names: List[Optional[str]] = []
+    recipients: List[Optional[str]] = []
+    texts: List[str] = []
+    create_times: List[Optional[float]] = []
+    content_types: List[str] = []
+    app_role = roles.append
+    app_name = names.append
+    app_recipient = recipients.append
+    app_text = texts.append
+    app_time = create_times.append
+    app_ctype = content_types.append
+
+    idx_get = idx_of.get
+    visited = bytearray(len(nodes))
+    current: Optional[int] = root_idx
+    while current is not None and not visited[current]:
+        visited[current] = 1
+        node = nodes[current]
+        msg = node.get("message")
+        if msg:
+            author = msg.get("author")
+            content = msg.get("content")
+            parts = content.get("parts") if content else None
+            if parts:
+                # Single-part messages are the norm; skip the generator join.
+                if len(parts) == 1:
+                    text = parts[0] if isinstance(parts[0], str) else ""
+                else:
+                    text = "\n".join(p for p in parts if isinstance(p, str))
+            else:
+                text = ""
+            app_role(author.get("role", "") if author else "")
+            app_name(author.get("name") if author else None)
+            app_recipient(msg.get("recipient"))
+            app_text(text)
+            app_time(msg.get("create_time"))
+            app_ctype(content.get("content_type", "text") if content else "text")
+        children = node.get("children")
+        current = idx_get(children[0]) if children else None
+
+    turns: List[Dict] = []
+    append_turn = turns.append
+    i = 0
+    n = len(roles)
+    while i < n:
+        if roles[i] != "user":
+            i += 1
+            continue
+        user_text = texts[i]
+        tool_uses: List[Dict] = []
+        assistant_parts: List[str] = []
+        j = i + 1
+        while j < n and roles[j] in _ASSIST_TOOL_ROLES:
+            if roles[j] == "tool" or content_types[j] == "code":
+                tool_uses.append({
+                    "tool_name": _normalise_tool_name(names[j] or recipients[j]),
+                })
+            elif texts[j]:
+                assistant_parts.append(texts[j])
+            j += 1
+        append_turn({
+            "user_message": {
+                "content": user_text,
+                "created_at": unix_to_iso(create_times[i]),
+                "has_code": _has_code(user_text),
+                "has_file_reference": _has_file_reference(user_text),
+                "corrections": detect_corrections(user_text),
+            },
+            "assistant_response": {
+                "content": "\n\n".join(assistant_parts),
+                "tool_uses": tool_uses,
+            },
+        })
+        i = j
+    return turns
+
+
+def normalise_conversation(raw: Dict) -> Dict:
+    """Convert one raw export conversation into the repo's session schema."""
+    mapping = raw.get("mapping") or {}
+    turns = flatten_mapping(mapping)
+    all_user_text = " ".join(t["user_message"]["content"] for t in turns)
+    language, domains, words = _analyse_user_text(all_user_text)
+    return {
+        "session_id": raw.get("conversation_id") or raw.get("id", ""),
+        "source": "chatgpt",
+        "title": raw.get("title") or "untitled",
+        "created_at": unix_to_iso(raw.get("create_time")),
+        "updated_at": unix_to_iso(raw.get("update_time")),
+        "turns": turns,
+        "metadata": {
+            "model": (raw.get("default_model_slug") or ""),
+            "language": language,
+            "domains": domains,
+            "user_word_count": words,
+        },
+    }
+
+
+def load_conversations(path: Path, since: Optional[str] = None) -> Iterable[Dict]:
+    """Yield conversations from conversations.json one at a time.
+
+    With ijson installed the top-level array is stream-parsed, so peak memory
+    stays at one conversation instead of the whole export; without it the
+    file is parsed in full and then iterated. The `since` filter is applied
+    before yielding, so discarded conversations are dropped as early as the
+    parser allows.
+    """
+    if ijson is not None:
+        with open(path, "rb") as fh:
+            yield from filter_by_date(ijson.items(fh, "item"), since)
+        return
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    yield from filter_by_date(data, since)
+
+
+def filter_by_date(conversations: Iterable[Dict], since: Optional[str]) -> Iterable[Dict]:
+    """Yield conversations created on/after `since` (YYYY-MM-DD); None keeps all."""
+    if not since:
+        yield from conversations
+        return
+    # The export stores epoch floats, so the cutoff converts once and each
+    # conversation is a float compare — no datetime object per item.
+    cutoff_ts = datetime.strptime(since, "%Y-%m-%d").replace(tzinfo=_UTC).timestamp()
+    if np is not None and isinstance(conversations, list) and len(conversations) > 1024:
+        # Materialized input (the non-ijson parse): gather the timestamps
+        # once and run the comparison as one vectorized mask instead of a
+        # per-item interpreted branch.
+        times = np.fromiter(
+            (c.get("create_time") or np.nan for c in conversations),
+            dtype=np.float64, count=len(conversations),
+        )
+        mask = np.isnan(times) | (times >= cutoff_ts)
+        for i in np.flatnonzero(mask):
+            yield conversations[i]
+        return
+    for conv in conversations:
+        create_time = conv.get("create_time")
+        if create_time is None or create_time >= cutoff_ts:
+            yield conv
+
+
+_NORM_CACHE_PATH = DATA_DIR / ".norm_cache.sqlite3"
+
+
+def _raw_hash(raw: Dict) -> str:
+    """Content hash of a raw conversation, stable across key order."""
+    if orjson is not None:
+        payload = orjson.dumps(raw, option=orjson.OPT_SORT_KEYS)
+    else:
+        payload = json.dumps(raw, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    if blake3 is not None:
+        # SIMD-accelerated; hashes far faster than normalisation runs.
+        return blake3.blake3(payload).hexdigest()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class _NormCache:
+    """sqlite cache of normalised conversations keyed by raw-content hash.
+
+    Reruns over an unchanged export skip normalisation entirely for raws
+    seen before; edited conversations hash differently and miss.
+    """
+
+    def __init__(self):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(_NORM_CACHE_PATH)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS norm_cache (hash TEXT PRIMARY KEY, conv BLOB)"
+        )
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT conv FROM norm_cache WHERE hash = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        blob = row[0]
+        return orjson.loads(blob) if orjson is not None else json.loads(blob)
+
+    def put(self, key: str, conv: Dict) -> None:
+        blob = _dump_conv(conv)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO norm_cache (hash, conv) VALUES (?, ?)", (key, blob)
+        )
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+
+def _normalise_raws(raws: List[Dict]) -> List[Dict]:
+    """Normalise raws in order, reusing cached results for unchanged input.
+
+    Cache lookups and stores stay on this thread (sqlite connections don't
+    cross process boundaries); only the misses fan out over the process
+    pool, and only when there are enough of them to pay for worker startup.
+    """
+    try:
+        cache = _NormCache()
+    except sqlite3.Error:
+        cache = None
+
+    results: List[Optional[Dict]] = [None] * len(raws)
+    miss_indices: List[int] = []
+    hashes: List[str] = []
+    for i, raw in enumerate(raws):
+        key = _raw_hash(raw)
+        hashes.append(key)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            miss_indices.append(i)
+
+    if miss_indices:
+        miss_raws = [raws[i] for i in miss_indices]
+        if len(miss_raws) >= _PARALLEL_MIN_ITEMS:
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+                normalised = list(pool.map(normalise_conversation, miss_raws, chunksize=32))
+        else:
+            normalised = [normalise_conversation(raw) for raw in miss_raws]
+        for i, conv in zip(miss_indices, normalised):
+            results[i] = conv
+            if cache is not None:
+                cache.put(hashes[i], conv)
+    if cache is not None:
+        cache.close()
+    return results  # type: ignore[return-value]
+
+
+_EXISTING_IDS_CACHE = DATA_DIR / ".chatgpt_existing_ids.json"
+
+
+def _load_existing_cache() -> Set[str]:
+    """Session ids already confirmed to exist in Notion on earlier runs."""
+    try:
+        raw = _EXISTING_IDS_CACHE.read_bytes()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        if isinstance(data, list):
+            return set(data)
+    except (OSError, ValueError):
+        pass
+    return set()
+
+
+def _write_existing_cache(ids: Set[str]) -> None:
+    payload = sorted(ids)
+    try:
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        if orjson is not None:
+            _EXISTING_IDS_CACHE.write_bytes(orjson.dumps(payload))
+        else:
+            _EXISTING_IDS_CACHE.write_bytes(json.dumps(payload).encode("utf-8"))
+    except OSError:
+        pass
+
+
+def _dump_conv(conv: Dict) -> bytes:
+    # orjson emits UTF-8 bytes directly; writing through a binary handle
+    # skips the TextIOWrapper encode pass.
+    if orjson is not None:
+        return orjson.dumps(conv, option=orjson.OPT_INDENT_2)
+    return json.dumps(conv, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _save_local(conv: Dict) -> None:
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    with open(DATA_DIR / f"{conv['session_id']}.json", "wb") as fh:
+        fh.write(_dump_conv(conv))
+
+
+class _LocalWriter:
+    """Buffer local session writes and flush them in batches.
+
+    One file per conversation is the on-disk contract, so the batching is
+    about syscall latency, not fewer files: each flush fans the buffered
+    open/write/close cycles out over a small thread pool instead of paying
+    them serially inside the import loop.
+    """
+
+    _BATCH_SIZE = 64
+    _FLUSH_WORKERS = 4
+
+    def __init__(self):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._buffered: List[Tuple[Path, bytes]] = []
+
+    def add(self, conv: Dict) -> None:
+        item = (DATA_DIR / f"{conv['session_id']}.json", _dump_conv(conv))
+        with self._lock:
+            self._buffered.append(item)
+            if len(self._buffered) < self._BATCH_SIZE:
+                return
+            batch, self._buffered = self._buffered, []
+        self._write_batch(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._buffered = self._buffered, []
+        if batch:
+            self._write_batch(batch)
+
+    @staticmethod
+    def _write_batch(batch: List[Tuple[Path, bytes]]) -> None:
+        def _write_one(item: Tuple[Path, bytes]) -> None:
+            fpath, data = item
+            with open(fpath, "wb") as fh:
+                fh.write(data)
+
+        with ThreadPoolExecutor(max_workers=_LocalWriter._FLUSH_WORKERS) as pool:
+            # Consume the iterator so write errors surface here.
+            for _ in pool.map(_write_one, batch):
+                pass
+
+
+class _RateLimiter:
+    """Allow at most `rate` acquisitions per rolling second across threads."""
+
+    def __init__(self, rate: int):
+        self._rate = rate
+        self._lock = threading.Lock()
+        self._stamps: deque = deque()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                stamps = self._stamps
+                while stamps and now - stamps[0] >= 1.0:
+                    stamps.popleft()
+                if len(stamps) < self._rate:
+                    stamps.append(now)
+                    return
+                wait = 1.0 - (now - stamps[0])
+            time.sleep(wait)
+
+
+class NotionClientError(Exception):
+    """Raised when the Notion API returns an error response."""
+
+
+class NotionClient:
+    """Minimal Notion REST client over urllib — pages and database queries."""
+
+    def __init__(self, token: str):
+        self._headers = {
+            "Authorization": f"Bearer {token}",
+            "Notion-Version": NOTION_VERSION,
+            "Content-Type": "application/json",
+        }
+        self._limiter = _RateLimiter(_NOTION_REQS_PER_SEC)
+
+    def _request(self, method: str, path: str, payload: Optional[Dict] = None) -> Dict:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        for attempt in range(_RETRY_MAX_ATTEMPTS):
+            req = urllib.request.Request(
+                f"{NOTION_API_BASE}{path}", data=data, headers=self._headers, method=method,
+            )
+            self._limiter.acquire()
+            try:
+                with urllib.request.urlopen(req, timeout=30) as resp:
+                    return json.loads(resp.read())
+            except urllib.error.HTTPError as exc:
+                body = exc.read().decode("utf-8", errors="replace")
+                # 429s and transient 5xxs back off and retry; the jitter
+                # keeps the three workers from retrying in lockstep.
+                if (exc.code == 429 or exc.code >= 500) and attempt + 1 < _RETRY_MAX_ATTEMPTS:
+                    try:
+                        retry_after = float(exc.headers.get("Retry-After") or 0.0)
+                    except (TypeError, ValueError):
+                        retry_after = 0.0
+                    delay = min(_RETRY_BASE_DELAY * 2 ** attempt, _RETRY_MAX_DELAY)
+                    time.sleep(max(retry_after, delay) + random.random() * 0.5)
+                    continue
+                raise NotionClientError(f"{method} {path} -> {exc.code}: {body}") from exc
+        raise NotionClientError(f"{method} {path}: retries exhausted")
+
+    def query_database(
+        self,
+        database_id: str,
+        payload: Optional[Dict] = None,
+        filter_properties: Optional[List[str]] = None,
+    ) -> Dict:
+        path = f"/databases/{database_id}/query"
+        # filter_properties is a query-string parameter (repeated per
+        # property id); projecting to the needed columns server-side cuts
+        # response bytes and client JSON-parse work by an order of
+        # magnitude on wide databases.
+        if filter_properties:
+            query = "&".join(
+                f"filter_properties={urllib.parse.quote(prop_id)}"
+                for prop_id in filter_properties
+            )
+            path = f"{path}?{query}"
+        return self._request("POST", path, payload or {})
+
+    def create_page(self, payload: Dict) -> Dict:
+        return self._request("POST", "/pages", payload)
+
+    def append_children(self, block_id: str, children: List[Dict]) -> Dict:
+        return self._request("PATCH", f"/blocks/{block_id}/children", {"children": children})
+
+
+def _page_session_id(page: Dict) -> str:
+    prop = page.get("properties", {}).get("Session ID", {})
+    rich = prop.get("rich_text") or []
+    return rich[0].get("plain_text", "") if rich else ""
+
+
+# Notion compound filters accept up to 100 clauses; 50 keeps payloads small.
+_DEDUP_BATCH_SIZE = 50
+
+# How many raw conversations main holds in memory at once. A multiple of
+# the dedup batch (fetch_existing_in_batch chunks its queries anyway) and
+# above _PARALLEL_MIN_ITEMS so windowed normalisation still engages the
+# process pool.
+_WINDOW_SIZE = 256
+
+
+def fetch_existing_in_batch(client: NotionClient, database_id: str,
+                            session_ids: List[str]) -> Set[str]:
+    """Return which of the given session ids already have pages.
+
+    One OR-filtered query per 50 ids, so the lookup cost scales with the
+    batch being imported rather than with the size of the workspace.
+    """
+    found: Set[str] = set()
+    for start in range(0, len(session_ids), _DEDUP_BATCH_SIZE):
+        batch = session_ids[start:start + _DEDUP_BATCH_SIZE]
+        payload: Dict = {
+            "filter": {"or": [
+                {"property": "Session ID", "rich_text": {"equals": sid}}
+                for sid in batch
+            ]},
+            "page_size": 100,
+        }
+        while True:
+            result = client.query_database(database_id, payload)
+            for page in result.get("results", []):
+                sid = _page_session_id(page)
+                if sid:
+                    found.add(sid)
+            if not result.get("has_more"):
+                break
+            payload["start_cursor"] = result.get("next_cursor")
+        payload.pop("start_cursor", None)
+    return found
+
+
+# The built blocks are serialized straight to the API and never mutated, so
+# the constant fragments are shared by reference across every turn instead
+# of re-allocating identical nested dicts per block.
+_USER_LABEL = {"type": "text", "text": {"content": "User: "},
+               "annotations": {"bold": True}}
+_ASSISTANT_LABEL = {"type": "text", "text": {"content": "Assistant: "},
+                    "annotations": {"bold": True}}
+
+
+@functools.lru_cache(maxsize=None)
+def _tool_block(tool_name: str) -> Dict:
+    # One block per distinct tool name; repeats reuse the cached dict.
+    return {
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {"rich_text": [
+            {"type": "text", "text": {"content": f"[tool: {tool_name}]"},
+             "annotations": {"italic": True}},
+        ]},
+    }
+
+
+def _build_turn_blocks(turns: List[Dict]) -> List[Dict]:
+    """Render turns as Notion paragraph blocks (User:/Assistant: prefixed)."""
+    blocks = []
+    append = blocks.append
+    for turn in turns:
+        user_text = truncate(turn["user_message"]["content"])
+        append({
+            "object": "block",
+            "type": "paragraph",
+            "paragraph": {"rich_text": [
+                _USER_LABEL,
+                {"type": "text", "text": {"content": user_text}},
+            ]},
+        })
+        for tu in turn["assistant_response"]["tool_uses"]:
+            append(_tool_block(tu["tool_name"]))
+        assistant_text = turn["assistant_response"]["content"]
+        if assistant_text:
+            append({
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {"rich_text": [
+                    _ASSISTANT_LABEL,
+                    {"type": "text", "text": {"content": truncate(assistant_text)}},
+                ]},
+            })
+    return blocks
+
+
+def create_conversation_page(client: NotionClient, database_id: str, conv: Dict) -> str:
+    """Create the Notion page for one normalised conversation; returns page id."""
+    properties = {
+        "Name": {"title": [{"text": {"content": truncate(conv["title"], 200)}}]},
+        "Session ID": {"rich_text": [{"text": {"content": conv["session_id"]}}]},
+        "Source": {"select": {"name": conv["source"]}},
+        "Language": {"select": {"name": conv["metadata"]["language"]}},
+        "Domains": {"multi_select": [{"name": d} for d in conv["metadata"]["domains"]]},
+        "Turns": {"number": len(conv["turns"])},
+    }
+    if conv["created_at"]:
+        properties["Created"] = {"date": {"start": conv["created_at"]}}
+    blocks = _build_turn_blocks(conv["turns"])
+    page = client.create_page({
+        "parent": {"database_id": database_id},
+        "properties": properties,
+        "children": blocks[:NOTION_CHILDREN_LIMIT],
+    })
+    page_id = page.get("id", "")
+    for start in range(NOTION_CHILDREN_LIMIT, len(blocks), NOTION_CHILDREN_LIMIT):
+        client.append_children(page_id, blocks[start:start + NOTION_CHILDREN_LIMIT])
+    return page_id
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import a ChatGPT export into Notion.")
+    parser.add_argument("export_path", help="Path to conversations.json from the export")
+    parser.add_argument("--since", help="Only import conversations created on/after YYYY-MM-DD")
+    parser.add_argument("--limit", type=int, help="Stop after importing N conversations")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Normalise and save locally without touching Notion")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Ignore the local cache of known-existing session ids")
+    args = parser.parse_args(argv)
+
+    stream = load_conversations(Path(args.export_path), args.since)
+
+    client = None
+    database_id = os.environ.get("NOTION_CHATGPT_DB_ID", "")
+    if not args.dry_run:
+        token = os.environ.get("NOTION_TOKEN", "")
+        if not token or not database_id:
+            print("NOTION_TOKEN and NOTION_CHATGPT_DB_ID must be set", file=sys.stderr)
+            return 1
+        client = NotionClient(token)
+
+    imported = skipped = errors = 0
+    total = 0
+    # Ids confirmed to exist on earlier runs are cached next to the data
+    # files, so warm reruns only query Notion for ids the cache has not seen.
+    cached_ids: Set[str] = set() if (args.refresh_cache or args.dry_run) else _load_existing_cache()
+    existing_ids: Set[str] = set()
+    imported_ids: Set[str] = set()
+    local_writer = _LocalWriter()
+
+    def process_one(idx: int, sid: str, title: str, conv: Dict) -> Tuple[int, str, str, str, str]:
+        if not conv["turns"]:
+            return idx, sid, title, "skipped", ""
+        if client is not None:
+            try:
+                create_conversation_page(client, database_id, conv)
+            except NotionClientError as exc:
+                # No local save on failure: a retry run must not find an
+                # orphan file for a session Notion never received.
+                return idx, sid, title, "error", str(exc)
+        local_writer.add(conv)
+        return idx, sid, title, "imported", ""
+
+    def process_window(window: List[Tuple[int, str, str, Dict]],
+                       upload_pool: ThreadPoolExecutor) -> bool:
+        """Dedup, normalise and upload one window; returns True on --limit."""
+        nonlocal imported, skipped, errors
+        unknown = [sid for _, sid, _, _ in window if sid not in cached_ids]
+        if client is not None and unknown:
+            existing_ids.update(fetch_existing_in_batch(client, database_id, unknown))
+        pending: List[Tuple[int, str, str, Dict]] = []
+        for idx, sid, title, raw in window:
+            if sid in cached_ids or sid in existing_ids:
+                skipped += 1
+                if pbar is not None:
+                    pbar.update(1)
+                continue
+            pending.append((idx, sid, title, raw))
+        if not pending:
+            return False
+        normalised = _normalise_raws([raw for _, _, _, raw in pending])
+        futures = [
+            upload_pool.submit(process_one, idx, sid, title, conv)
+            for (idx, sid, title, _), conv in zip(pending, normalised)
+        ]
+        for future in as_completed(futures):
+            idx, sid, title, status, detail = future.result()
+            if status == "skipped":
+                skipped += 1
+            elif status == "error":
+                message = f"  [{idx}] error: {title[:40]}: {detail}"
+                if pbar is not None:
+                    tqdm.write(message, file=sys.stderr)
+                else:
+                    print(message, file=sys.stderr)
+                errors += 1
+            else:
+                imported += 1
+                imported_ids.add(sid)
+                if pbar is None:
+                    print(f"  [{idx}] imported: {title[:40]}")
+                if args.limit and imported >= args.limit:
+                    for pending_future in futures:
+                        pending_future.cancel()
+                    return True
+            if pbar is not None:
+                pbar.update(1)
+                pbar.set_postfix(last=title[:40], imported=imported, skipped=skipped)
+        return False
+
+    # The export is consumed in bounded windows so memory stays at
+    # O(window), not O(export), no matter how large the dump is: collect a
+    # window of raws off the stream, ask Notion which of them already exist
+    # (OR-filtered queries of 50 ids each), normalise the remainder, upload,
+    # then drop every reference before pulling the next window. Page
+    # creation is network-bound, so three workers (the API's
+    # per-integration rate limit) overlap the RTTs while the client's
+    # limiter keeps the request rate legal; results are aggregated on this
+    # thread, so no counter locks.
+    pbar = tqdm(unit="conv") if tqdm is not None else None
+    stopped = False
+    with ThreadPoolExecutor(max_workers=_NOTION_MAX_WORKERS) as upload_pool:
+        window: List[Tuple[int, str, str, Dict]] = []
+        for idx, raw in enumerate(stream, 1):
+            total = idx
+            session_id = raw.get("conversation_id") or raw.get("id", "")
+            window.append((idx, session_id, raw.get("title") or "untitled", raw))
+            if len(window) >= _WINDOW_SIZE:
+                stopped = process_window(window, upload_pool)
+                window = []
+                if stopped:
+                    break
+        if window and not stopped:
+            process_window(window, upload_pool)
+    if pbar is not None:
+        pbar.close()
+    print(f"{total} conversations considered")
+
+    local_writer.flush()
+    if not args.dry_run:
+        _write_existing_cache(cached_ids | existing_ids | imported_ids)
+    print(f"done: {imported} imported, {skipped} skipped, {errors} errors")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,793 @@
+"""Import Claude Code session logs into the conversation archive and Notion.
+
+Claude Code writes one JSONL file per session under
+``~/.claude/projects/<project-dir>/<session-id>.jsonl``; each line is a
+record with a ``type`` ("user", "assistant" or "summary"), a ``message``
+payload and an ISO timestamp. This script pairs the user/assistant
+messages into turns, runs the same lightweight per-turn analysis the
+ChatGPT importer does (language, corrections, code/file references),
+saves the normalised conversation locally and pushes it to the Notion
+sessions database.
+
+Usage:
+    python ingest_claude_code.py [--projects-dir DIR] [--since DATE]
+                                 [--limit N] [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import queue
+import re
+import shelve
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
+try:
+    # re2 compiles to a DFA and matches in linear time. The patterns
+    # compiled through _re below are re2-compatible (no backreferences,
+    # no lookaround); _CORRECTION_RE needs a lookahead and stays on
+    # stdlib re.
+    import re2
+except ImportError:  # pragma: no cover - optional accelerator
+    re2 = None
+
+_re = re2 if re2 is not None else re
+
+from ingest_chatgpt import (
+    DATA_DIR,
+    NOTION_CHILDREN_LIMIT,
+    _NOTION_MAX_WORKERS,
+    NotionClient,
+    NotionClientError,
+    _page_session_id,
+    truncate,
+)
+
+CLAUDE_PROJECTS_DIR = Path(
+    os.environ.get("CLAUDE_PROJECTS_DIR", "~/.claude/projects")
+).expanduser()
+
+# Notion's filter_properties projection takes property ids, not names;
+# the id of the Session ID column is database-specific, so it comes from
+# the environment. When unset, queries return full page objects.
+_SESSION_ID_PROP_ID = os.environ.get("NOTION_SESSION_ID_PROP_ID", "")
+
+# Parsed conversations are memoized by (path, mtime, size); Claude Code
+# never rewrites finished session files, so a hit skips the whole JSON
+# decode and turn-pairing pass on re-runs.
+_PARSE_CACHE_PATH = DATA_DIR / ".parsed_sessions.db"
+
+# Below this many cache misses a worker pool costs more in start-up than
+# it saves; parse serially instead.
+_PARALLEL_MIN_FILES = 4
+
+# Content is capped per side of a turn before analysis and upload; Claude
+# Code tool-result dumps can run to hundreds of KB and the downstream
+# consumers only ever show the head.
+_CONTENT_CAP = 5000
+
+# (pattern, correction type) pairs scanned against each user turn after the
+# first; same taxonomy as the ChatGPT importer.
+_CORRECTION_PATTERNS = [
+    (r"\bno[,.] ", "rejection"),
+    (r"\bthat'?s (?:wrong|not right|incorrect)\b", "rejection"),
+    (r"\bi meant\b", "clarification"),
+    (r"\bactually[, ]", "clarification"),
+    (r"\binstead\b", "redirection"),
+    (r"\bdon'?t\b", "redirection"),
+    (r"\bundo\b", "revert"),
+    (r"\brevert\b", "revert"),
+    (r"不对", "rejection"),
+    (r"错了", "rejection"),
+    (r"不是这样", "rejection"),
+    (r"我是说", "clarification"),
+    (r"应该是", "clarification"),
+    (r"别", "redirection"),
+]
+
+# All indicators are folded into one alternation so each user turn is
+# scanned once instead of once per pattern; the named group maps a match
+# back to its correction type. The alternation is wrapped in a zero-width
+# lookahead so indicators that start inside another's span still match —
+# a plain alternation consumes its match and would skip them. RE2 has no
+# lookaround, so this one pattern is compiled with stdlib re even when
+# re2 is installed.
+_CORRECTION_RE = re.compile(
+    "(?="
+    + "|".join(
+        f"(?P<g{i}>{pattern})" for i, (pattern, _) in enumerate(_CORRECTION_PATTERNS)
+    )
+    + ")"
+)
+_GROUP_TO_CTYPE = {
+    f"g{i}": ctype for i, (_, ctype) in enumerate(_CORRECTION_PATTERNS)
+}
+# None of the indicator patterns contain capturing groups of their own, so
+# match.lastindex is exactly the 1-based alternation branch: a tuple index
+# replaces the string-keyed dict lookup per hit. The bound finditer skips
+# the attribute dispatch per call.
+_CTYPE_BY_GROUP = (None,) + tuple(ctype for _, ctype in _CORRECTION_PATTERNS)
+_CORRECTION_FINDITER = _CORRECTION_RE.finditer
+
+_CJK_RE = _re.compile("[一-鿿]")
+_LATIN_WORD_RE = _re.compile(r"[A-Za-z0-9_']+")
+_INLINE_CODE_RE = _re.compile(r"`[^`]+`")
+_FILE_REF_RE = _re.compile(
+    r"(?:^|[\s\"'(])(?:\.{0,2}/[\w./-]+|[A-Za-z]:\\[\w.\\/-]+)"
+)
+
+# Deleting the CJK block via str.translate runs as one C loop over the
+# string; the count falls out of the length difference without the
+# per-match list that findall allocates.
+_STRIP_CJK = dict.fromkeys(range(0x4E00, 0xA000), None)
+
+_TS_FORMATS = [
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+]
+
+if orjson is not None:
+    _json_loads = orjson.loads
+else:
+    # json.loads re-validates its kwargs and sniffs the input encoding on
+    # every call before handing off to a decoder; binding one decoder's
+    # decode method skips that per-line dispatch. Bytes still need the
+    # utf-8 step the C accelerator would otherwise do internally.
+    _json_decode = json.JSONDecoder().decode
+
+    def _json_loads(raw_line):
+        if isinstance(raw_line, (bytes, bytearray)):
+            raw_line = raw_line.decode("utf-8")
+        return _json_decode(raw_line)
+
+
+def _dump_conv(conv: Dict) -> bytes:
+    # Compact output: nothing reads these files by eye in the hot path and
+    # indenting costs both serialize time and ~1.5x the bytes on disk.
+    if orjson is not None:
+        return orjson.dumps(conv, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(conv, ensure_ascii=False).encode("utf-8")
+
+
+def _parse_timestamp(ts: str) -> Optional[datetime]:
+    """Parse a Claude Code timestamp; returns an aware datetime or None."""
+    if not ts:
+        return None
+    # fromisoformat is C-implemented and covers every variant Claude Code
+    # emits (including the trailing Z); the strptime ladder only runs for
+    # the odd hand-written --since value it cannot take.
+    try:
+        dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    else:
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt
+    for fmt in _TS_FORMATS:
+        try:
+            dt = datetime.strptime(ts, fmt)
+        except ValueError:
+            continue
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt
+    return None
+
+
+@functools.lru_cache(maxsize=8192)
+def detect_language(text: str) -> str:
+    """Classify a message as zh or en by CJK character density."""
+    if not text:
+        return "en"
+    cjk = len(text) - len(text.translate(_STRIP_CJK))
+    return "zh" if cjk > len(text) * 0.05 else "en"
+
+
+@functools.lru_cache(maxsize=8192)
+def word_count(text: str) -> int:
+    """Count words: CJK characters count individually, latin runs as one."""
+    if not text:
+        return 0
+    return len(_CJK_RE.findall(text)) + len(_LATIN_WORD_RE.findall(text))
+
+
+@functools.lru_cache(maxsize=8192)
+def has_code_in_text(text: str) -> bool:
+    """True when the text carries a fenced block or inline code span."""
+    # The substring check is a C memmem and catches fenced blocks without
+    # touching the regex engine at all.
+    if "```" in text:
+        return True
+    return _INLINE_CODE_RE.search(text) is not None
+
+
+@functools.lru_cache(maxsize=8192)
+def has_file_reference(text: str) -> bool:
+    """True when the text mentions a unix or windows style file path."""
+    return _FILE_REF_RE.search(text) is not None
+
+
+def _clear_text_caches() -> None:
+    """Drop the per-text memo tables; called between session files so the
+    caches only ever hold one session's worth of strings."""
+    detect_language.cache_clear()
+    word_count.cache_clear()
+    has_code_in_text.cache_clear()
+    has_file_reference.cache_clear()
+
+
+def detect_corrections(text: str) -> List[str]:
+    """Return the correction types whose indicator appears in the text."""
+    corrections: List[str] = []
+    seen_types: Set[str] = set()
+    lower = text.lower()
+    for match in _CORRECTION_FINDITER(lower):
+        ctype = _CTYPE_BY_GROUP[match.lastindex]
+        if ctype not in seen_types:
+            corrections.append(ctype)
+            seen_types.add(ctype)
+    return corrections
+
+
+def extract_text_from_content(content: Any) -> str:
+    """Join the text blocks of a message content payload into one string."""
+    if isinstance(content, str):
+        return content
+    if not isinstance(content, list):
+        return ""
+    # Single-block payloads are the common case for prompts; skip the list
+    # machinery for them entirely.
+    if len(content) == 1:
+        block = content[0]
+        if isinstance(block, dict) and block.get("type") == "text":
+            return block.get("text", "")
+        return ""
+    parts: List[Optional[str]] = [None] * len(content)
+    for i, block in enumerate(content):
+        if isinstance(block, dict) and block.get("type") == "text":
+            parts[i] = block.get("text", "")
+    return "\n".join(p for p in parts if p)
+
+
+def _scan_assistant_content(content: Any) -> Tuple[str, List[Dict], List[str], bool]:
+    """Collect text, tool uses, tool-use ids and the thinking flag in one
+    walk of the assistant content, instead of one pass per extractor."""
+    if isinstance(content, str):
+        return content, [], [], False
+    if not isinstance(content, list):
+        return "", [], [], False
+    parts: List[str] = []
+    tool_uses: List[Dict] = []
+    tool_ids: List[str] = []
+    thinking = False
+    for block in content:
+        if not isinstance(block, dict):
+            continue
+        btype = block.get("type")
+        if btype == "text":
+            text = block.get("text", "")
+            if text:
+                parts.append(text)
+        elif btype == "tool_use":
+            tool_id = block.get("id", "")
+            tool_uses.append({"id": tool_id, "tool_name": block.get("name", "")})
+            tool_ids.append(tool_id)
+        elif btype == "thinking":
+            thinking = True
+    return "\n".join(parts), tool_uses, tool_ids, thinking
+
+
+def _tool_results_from_user(content: Any) -> Dict[str, bool]:
+    """Map tool_use_id -> success for the tool_result blocks of a user message."""
+    if not isinstance(content, list):
+        return {}
+    return {
+        block.get("tool_use_id", ""): not block.get("is_error", False)
+        for block in content
+        if isinstance(block, dict) and block.get("type") == "tool_result"
+    }
+
+
+def parse_session(jsonl_path: Path) -> Optional[Dict]:
+    """Parse one session JSONL file into the normalised conversation schema.
+
+    Returns None for sessions with no usable user/assistant turns.
+    """
+    _clear_text_caches()
+    messages: List[Dict] = []
+    summary_title = ""
+    # Binary reads skip the TextIOWrapper decode/newline-translation step;
+    # both json and orjson accept bytes (and tolerate the trailing newline)
+    # so nothing needs stripping per line. The larger buffer cuts read(2)
+    # calls on multi-MB session files.
+    with open(jsonl_path, "rb", buffering=1 << 17) as fh:
+        for raw_line in fh:
+            if raw_line == b"\n" or not raw_line:
+                continue
+            try:
+                record = _json_loads(raw_line)
+            except ValueError:
+                continue
+            rtype = record.get("type")
+            if rtype == "summary":
+                summary_title = record.get("summary", "") or summary_title
+                continue
+            if rtype != "user" and rtype != "assistant":
+                continue
+            message = record.get("message")
+            if not isinstance(message, dict):
+                continue
+            messages.append({
+                "role": message.get("role", rtype),
+                "content": message.get("content", ""),
+                "timestamp": record.get("timestamp", ""),
+            })
+    if not messages:
+        return None
+
+    # Every appended message dict gets a "timestamp" key in the read loop
+    # above, so the C-level itemgetter can serve as the sort key directly.
+    messages.sort(key=itemgetter("timestamp"))
+
+    turns: List[Dict] = []
+    n = len(messages)
+    # Tool-result payloads are the longest content in a session; scan each
+    # user message for them at most once, whatever mix of "current prompt"
+    # and "i+2 result carrier" roles it plays across iterations.
+    tool_results_by_index: Dict[int, Dict[str, bool]] = {}
+
+    def _tool_results_at(j: int) -> Dict[str, bool]:
+        results = tool_results_by_index.get(j)
+        if results is None:
+            results = _tool_results_from_user(messages[j]["content"])
+            tool_results_by_index[j] = results
+        return results
+
+    i = 0
+    while i < n:
+        msg = messages[i]
+        if msg["role"] != "user":
+            i += 1
+            continue
+        user_content = msg["content"]
+        user_text = extract_text_from_content(user_content)
+        # Tool-result-only user messages carry results for the previous
+        # assistant turn; they are consumed below, not turned into prompts.
+        if not user_text.strip():
+            i += 1
+            continue
+
+        assistant = None
+        if i + 1 < n and messages[i + 1]["role"] == "assistant":
+            assistant = messages[i + 1]
+        a_text = ""
+        tool_uses: List[Dict] = []
+        thinking = False
+        if assistant is not None:
+            a_text, tool_uses, tool_ids, thinking = _scan_assistant_content(
+                assistant["content"]
+            )
+            if tool_ids and i + 2 < n and messages[i + 2]["role"] == "user":
+                results = _tool_results_at(i + 2)
+                for tool in tool_uses:
+                    tid = tool.get("id", "")
+                    if tid in results:
+                        tool["success"] = results[tid]
+
+        # One slice serves both the stored content and the correction scan,
+        # so oversized tool-result dumps are never walked twice.
+        truncated = user_text[:_CONTENT_CAP]
+        turns.append({
+            "turn_id": len(turns),
+            "language": detect_language(user_text),
+            "user_message": {
+                "content": truncated,
+                "timestamp": msg.get("timestamp", ""),
+                "word_count": word_count(user_text),
+                "has_code": has_code_in_text(user_text),
+                "has_file_reference": has_file_reference(user_text),
+                "corrections": detect_corrections(truncated) if turns else [],
+            },
+            "assistant_response": {
+                "content": a_text[:_CONTENT_CAP],
+                "has_thinking": thinking,
+                "tool_uses": tool_uses,
+            },
+        })
+        i += 2 if assistant is not None else 1
+
+    if not turns:
+        return None
+
+    lang_counts = Counter(turn["language"] for turn in turns)
+    primary_language = lang_counts.most_common(1)[0][0] if lang_counts else "en"
+
+    first_dt = _parse_timestamp(messages[0].get("timestamp", ""))
+    last_dt = _parse_timestamp(messages[-1].get("timestamp", ""))
+    title = summary_title or turns[0]["user_message"]["content"][:60]
+    return {
+        "session_id": jsonl_path.stem,
+        "source": "claude_code",
+        "title": title,
+        "created_at": first_dt.isoformat() if first_dt else "",
+        "updated_at": last_dt.isoformat() if last_dt else "",
+        "turns": turns,
+        "metadata": {
+            "project": jsonl_path.parent.name,
+            "language": primary_language,
+            "num_turns": len(turns),
+        },
+    }
+
+
+def _cache_key(jsonl_path: Path) -> str:
+    st = jsonl_path.stat()
+    return f"{jsonl_path}\x00{st.st_mtime_ns}\x00{st.st_size}"
+
+
+def _iter_parsed_sessions(paths: List[Path], shelf: "shelve.Shelf"):
+    """Yield parsed conversations in path order as they become available.
+
+    Cache lookups and shelf writes stay on the main thread (the shelf is
+    not shareable); misses are CPU-bound and independent, so enough of
+    them go to a process pool. pool.map is lazy, so downstream consumers
+    start receiving conversations while later files are still parsing.
+    """
+    keys = [_cache_key(jsonl_path) for jsonl_path in paths]
+    miss_paths = [p for p, key in zip(paths, keys) if key not in shelf]
+    pool = None
+    if len(miss_paths) < _PARALLEL_MIN_FILES:
+        miss_iter = map(parse_session, miss_paths)
+    else:
+        pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        miss_iter = pool.map(parse_session, miss_paths, chunksize=4)
+    try:
+        for key in keys:
+            if key in shelf:
+                yield shelf[key]
+            else:
+                conv = next(miss_iter)
+                shelf[key] = conv
+                yield conv
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+# Local saves are buffered and drained in batches: one open/write/close
+# per session adds up over thousands of files, especially on networked
+# home directories. The atexit hook covers early exits.
+_SAVE_BATCH_SIZE = 64
+_SAVE_BUFFER: List[Tuple[Path, bytes]] = []
+_SAVE_LOCK = threading.Lock()
+
+
+def _write_save_batch(batch: List[Tuple[Path, bytes]]) -> None:
+    def _write_one(item: Tuple[Path, bytes]) -> None:
+        fpath, data = item
+        fpath.write_bytes(data)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        # Consume the iterator so write errors surface here instead of
+        # dying silently in a discarded future.
+        for _ in pool.map(_write_one, batch):
+            pass
+
+
+def _flush_save_buffer() -> None:
+    with _SAVE_LOCK:
+        batch = _SAVE_BUFFER[:]
+        _SAVE_BUFFER.clear()
+    if batch:
+        _write_save_batch(batch)
+
+
+atexit.register(_flush_save_buffer)
+
+
+def _save_local(conv: Dict) -> Path:
+    """Queue the normalised conversation for a batched write to the shared
+    data directory; returns its eventual path."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    fpath = DATA_DIR / f"{conv['session_id']}.json"
+    item = (fpath, _dump_conv(conv))
+    with _SAVE_LOCK:
+        _SAVE_BUFFER.append(item)
+        if len(_SAVE_BUFFER) < _SAVE_BATCH_SIZE:
+            return fpath
+        batch = _SAVE_BUFFER[:]
+        _SAVE_BUFFER.clear()
+    _write_save_batch(batch)
+    return fpath
+
+
+def _stream_existing_session_ids(
+    client: NotionClient,
+    database_id: str,
+    existing: Set[str],
+    lock: threading.Lock,
+    done: threading.Event,
+) -> None:
+    """Fill `existing` with Session IDs page by page; sets `done` at the end.
+
+    Runs on a background thread so session parsing can start while the
+    paginated scan is still in flight; readers that need the complete set
+    wait on `done`.
+    """
+    cursor: Optional[str] = None
+    try:
+        while True:
+            payload: Dict = {"page_size": 100}
+            if cursor:
+                payload["start_cursor"] = cursor
+            data = client.query_database(
+                database_id,
+                payload,
+                filter_properties=(
+                    [_SESSION_ID_PROP_ID] if _SESSION_ID_PROP_ID else None
+                ),
+            )
+            with lock:
+                for page in data.get("results", []):
+                    sid = _page_session_id(page)
+                    if sid:
+                        existing.add(sid)
+            if not data.get("has_more"):
+                return
+            cursor = data.get("next_cursor")
+    finally:
+        done.set()
+
+
+def fetch_existing_session_ids(client: NotionClient, database_id: str) -> Set[str]:
+    """Collect every Session ID already present in the Notion database."""
+    existing: Set[str] = set()
+    _stream_existing_session_ids(
+        client, database_id, existing, threading.Lock(), threading.Event()
+    )
+    return existing
+
+
+def _build_turn_blocks(turns: List[Dict]) -> List[Dict]:
+    blocks: List[Dict] = []
+    for turn in turns:
+        user = turn.get("user_message", {})
+        assistant = turn.get("assistant_response", {})
+        blocks.append({
+            "object": "block",
+            "type": "paragraph",
+            "paragraph": {"rich_text": [
+                {"type": "text", "text": {"content": "User: "},
+                 "annotations": {"bold": True}},
+                {"type": "text", "text": {"content": truncate(user.get("content", ""))}},
+            ]},
+        })
+        for tool in assistant.get("tool_uses", []):
+            blocks.append({
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {"rich_text": [
+                    {"type": "text", "text": {"content": f"[tool: {tool.get('tool_name', '')}]"},
+                     "annotations": {"code": True}},
+                ]},
+            })
+        if assistant.get("content"):
+            blocks.append({
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {"rich_text": [
+                    {"type": "text", "text": {"content": "Assistant: "},
+                     "annotations": {"bold": True}},
+                    {"type": "text", "text": {"content": truncate(assistant.get("content", ""))}},
+                ]},
+            })
+    return blocks
+
+
+def write_to_notion(client: NotionClient, database_id: str, conv: Dict) -> str:
+    """Create the Notion page for one conversation; returns the page id."""
+    metadata = conv.get("metadata", {})
+    properties = {
+        "Name": {"title": [{"text": {"content": truncate(conv.get("title", ""), 200)}}]},
+        "Session ID": {"rich_text": [{"text": {"content": conv.get("session_id", "")}}]},
+        "Source": {"select": {"name": conv.get("source", "claude_code")}},
+        "Project": {"rich_text": [{"text": {"content": metadata.get("project", "")}}]},
+        "Language": {"select": {"name": metadata.get("language", "en")}},
+        "Turns": {"number": metadata.get("num_turns", 0)},
+    }
+    if conv.get("created_at"):
+        properties["Created"] = {"date": {"start": conv["created_at"]}}
+    page = client.create_page({
+        "parent": {"database_id": database_id},
+        "properties": properties,
+    })
+    page_id = page.get("id", "")
+    blocks = _build_turn_blocks(conv.get("turns", []))
+    for start in range(0, len(blocks), NOTION_CHILDREN_LIMIT):
+        client.append_children(page_id, blocks[start:start + NOTION_CHILDREN_LIMIT])
+    return page_id
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Import Claude Code sessions into the archive and Notion"
+    )
+    parser.add_argument(
+        "--projects-dir", type=Path, default=CLAUDE_PROJECTS_DIR,
+        help="Claude Code projects directory (default: ~/.claude/projects)",
+    )
+    parser.add_argument("--since", help="only import sessions created on/after this date")
+    parser.add_argument("--limit", type=int, default=0, help="stop after N imports")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="parse and save locally without touching Notion")
+    args = parser.parse_args(argv)
+
+    if not args.projects_dir.is_dir():
+        print(f"projects dir not found: {args.projects_dir}", file=sys.stderr)
+        return 1
+    since_dt = _parse_timestamp(args.since) if args.since else None
+    if args.since and since_dt is None:
+        print(f"cannot parse --since value: {args.since}", file=sys.stderr)
+        return 1
+
+    client = None
+    database_id = ""
+    if not args.dry_run:
+        token = os.environ.get("NOTION_TOKEN", "")
+        database_id = os.environ.get("NOTION_CLAUDE_CODE_DB_ID", "")
+        if not token or not database_id:
+            print("NOTION_TOKEN and NOTION_CLAUDE_CODE_DB_ID must be set", file=sys.stderr)
+            return 1
+        client = NotionClient(token)
+
+    # The existing-id scan pages in on a background thread so candidate
+    # gathering and parsing start immediately instead of serializing cold
+    # start behind dozens of query pages. The walk below skips whatever
+    # ids have arrived so far; the producer loop waits for the complete
+    # set before letting a conversation through to upload.
+    existing_ids: Set[str] = set()
+    ids_lock = threading.Lock()
+    ids_done = threading.Event()
+    if client is not None:
+        threading.Thread(
+            target=_stream_existing_session_ids,
+            args=(client, database_id, existing_ids, ids_lock, ids_done),
+            daemon=True,
+        ).start()
+    else:
+        ids_done.set()
+
+    imported = skipped = errors = 0
+    candidates: List[Path] = []
+    for project_dir in sorted(args.projects_dir.iterdir()):
+        if not project_dir.is_dir():
+            continue
+        for jsonl_path in sorted(project_dir.glob("*.jsonl")):
+            # The session id is the file stem, so already-uploaded sessions
+            # are skipped before their JSON is ever touched — against the
+            # ids fetched so far; stragglers get caught at upload time.
+            with ids_lock:
+                known = jsonl_path.stem in existing_ids
+            if known:
+                skipped += 1
+                continue
+            # Session files are append-only, so mtime is an upper bound on
+            # created_at: anything last touched before the cutoff cannot
+            # have been created inside the window. Rejecting on the stat
+            # alone saves the whole-file read for historical sessions.
+            if since_dt is not None:
+                mtime = datetime.fromtimestamp(
+                    jsonl_path.stat().st_mtime, tz=timezone.utc
+                )
+                if mtime < since_dt:
+                    continue
+            candidates.append(jsonl_path)
+
+    def upload_one(conv: Dict) -> tuple:
+        _save_local(conv)
+        if client is not None:
+            try:
+                write_to_notion(client, database_id, conv)
+            except NotionClientError as exc:
+                return conv, "error", str(exc)
+        return conv, "imported", ""
+
+    # Producer/consumer pipeline: the main thread streams parsed
+    # conversations into a bounded queue while a few consumer threads run
+    # the Notion round-trips, so parse time and server latency overlap
+    # instead of adding up. The queue bound caps how many conversations
+    # sit in memory; the client's limiter still caps requests per second.
+    upload_queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=16)
+    counts_lock = threading.Lock()
+    stop = threading.Event()
+    claimed = 0  # --limit slots taken, counting uploads still in flight
+
+    def consume() -> None:
+        nonlocal imported, errors, claimed
+        while True:
+            conv = upload_queue.get()
+            if conv is None:
+                return
+            with counts_lock:
+                if args.limit and claimed >= args.limit:
+                    stop.set()
+                    continue
+                claimed += 1
+            conv, status, detail = upload_one(conv)
+            with counts_lock:
+                if status == "error":
+                    print(f"  error: {conv['title'][:40]}: {detail}", file=sys.stderr)
+                    errors += 1
+                    claimed -= 1  # errors do not consume a limit slot
+                    continue
+                imported += 1
+                print(f"  imported: {conv['title'][:40]}")
+                if args.limit and imported >= args.limit:
+                    stop.set()
+
+    consumers = [
+        threading.Thread(target=consume) for _ in range(_NOTION_MAX_WORKERS)
+    ]
+    for thread in consumers:
+        thread.start()
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    parse_cache = shelve.open(str(_PARSE_CACHE_PATH))
+    # The sentinels must reach the consumers even when the producer dies
+    # mid-stream (shelf I/O error, a candidate deleted between scan and
+    # stat, a pool failure) — otherwise the non-daemon threads block on
+    # the queue forever and the process hangs instead of reporting the
+    # traceback.
+    try:
+        for conv in _iter_parsed_sessions(candidates, parse_cache):
+            if conv is None:
+                continue
+            if since_dt is not None:
+                created_dt = _parse_timestamp(conv.get("created_at", ""))
+                if created_dt is not None and created_dt < since_dt:
+                    continue
+            if stop.is_set():
+                break
+            # Dedup against the complete id set; by the time the first
+            # parses stream out, the background scan has usually finished
+            # anyway.
+            ids_done.wait()
+            if conv["session_id"] in existing_ids:
+                skipped += 1
+                continue
+            upload_queue.put(conv)
+    finally:
+        parse_cache.close()
+        for _ in consumers:
+            upload_queue.put(None)
+        for thread in consumers:
+            thread.join()
+
+    _flush_save_buffer()
+    print(f"done: {imported} imported, {skipped} skipped, {errors} errors")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""Sync per-session insight sidecars and analysis run bundles.
+
+Subcommands:
+  backfill     run the analysis pass over sessions missing (or failing) sidecars
+  incremental  re-sync reports from existing valid sidecars for a period window
+  status       print sidecar counts
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import functools
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
+_NEXUS_ROOT = Path(os.environ.get("NEXUS_HOME", "~/.nexus")).expanduser()
+_INSIGHTS_DIR = _NEXUS_ROOT / "insights"
+_INSIGHTS_SESSION_DIR = _INSIGHTS_DIR / "sessions"
+_RUNS_DIR = _INSIGHTS_DIR / "runs"
+
+_SESSION_SCHEMA = 2
+_REQUIRED_KEYS = frozenset({"session_id", "mechanism"})
+_HASH_INDEX_PATH = _INSIGHTS_SESSION_DIR / ".hash_index.json"
+_SYNC_WRITES = os.environ.get("NEXUS_SYNC") == "1"
+
+_README_TEMPLATE = """\
+# Analysis run {run_id}
+
+Sessions in bundle: {n_sessions}
+
+Files:
+- `bundle.json` — session digests handed to the analysis pass
+- `result.json` — raw analysis output (written by the run)
+- `reports/` — per-period reports synced from sidecars
+
+Sidecars live under `insights/sessions/`, one JSON file per session.
+"""
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _read_json(path: Path) -> Dict:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_json(path: Path, payload: Dict) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, ensure_ascii=False, indent=2)
+
+
+def _write_bytes(path: Path, data: bytes) -> None:
+    """One open/write/close, no fsync; durability is handled per batch."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Flush a directory's metadata (renames) when NEXUS_SYNC=1."""
+    if not _SYNC_WRITES:
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@functools.lru_cache(maxsize=None)
+def _ensured(path_str: str) -> None:
+    """mkdir -p once per path per process; repeat calls are a cache hit."""
+    Path(path_str).mkdir(parents=True, exist_ok=True)
+
+
+def _ensure_dirs() -> None:
+    _ensured(str(_INSIGHTS_SESSION_DIR))
+    _ensured(str(_RUNS_DIR))
+
+
+@functools.lru_cache(maxsize=4096)
+def _week_from_timestamp(ts: str) -> str:
+    """Map an ISO timestamp to its ISO week id, e.g. '2025-W07'.
+
+    Cached: timestamps within one run cluster heavily on the same days, so
+    repeats skip the datetime parse + isocalendar.
+    """
+    if not ts:
+        return "unknown"
+    try:
+        dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError:
+        return "unknown"
+    year, week, _ = dt.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class _SessionRec:
+    """Hot-path view of one result item: attribute slots instead of dict ops.
+
+    Defaulting during the apply pass is attribute assignment; the backing
+    `raw` dict is only touched again at render time.
+    """
+
+    __slots__ = ("session_id", "schema_version", "generated_by", "week", "period_id", "raw")
+
+    def __init__(self, raw: Dict) -> None:
+        self.raw = raw
+        self.session_id = raw.get("session_id") or ""
+        self.schema_version = raw.get("schema_version")
+        self.generated_by = raw.get("generated_by")
+        self.week = raw.get("week") or None
+        self.period_id = raw.get("period_id") or None
+
+
+def _normalize_session_payload(payload: Dict) -> List[_SessionRec]:
+    """Pull the per-session items out of a raw result payload, dropping junk."""
+    sessions = payload.get("sessions")
+    if not isinstance(sessions, list):
+        return []
+    items = []
+    for item in sessions:
+        if isinstance(item, dict) and item.get("session_id"):
+            items.append(_SessionRec(item))
+    return items
+
+
+def validate_session_mechanism(item: Dict) -> List[str]:
+    """Validate one sidecar record; returns a list of error strings (empty = valid)."""
+    errors = []
+    if not isinstance(item.get("session_id"), str) or not item.get("session_id"):
+        errors.append("missing session_id")
+    mechanism = item.get("mechanism")
+    if not isinstance(mechanism, dict):
+        errors.append("missing mechanism")
+    schema = item.get("schema_version")
+    if schema is not None and schema != _SESSION_SCHEMA:
+        errors.append(f"schema_version {schema!r} != {_SESSION_SCHEMA}")
+    return errors
+
+
+def _load_hash_index() -> Dict[str, str]:
+    if _HASH_INDEX_PATH.is_file():
+        try:
+            index = _read_json(_HASH_INDEX_PATH)
+            if isinstance(index, dict):
+                return index
+        except (OSError, json.JSONDecodeError):
+            pass
+    return {}
+
+
+def _scan_sidecar_index() -> Dict[str, os.stat_result]:
+    """One scandir pass over the sidecar dir: session_id -> stat result."""
+    idx: Dict[str, os.stat_result] = {}
+    if not _INSIGHTS_SESSION_DIR.is_dir():
+        return idx
+    for entry in os.scandir(_INSIGHTS_SESSION_DIR):
+        if entry.name.endswith(".json") and not entry.name.startswith("."):
+            idx[entry.name[:-5]] = entry.stat(follow_symlinks=False)
+    return idx
+
+
+def _session_needs_backfill(session_id: str, idx: Dict[str, os.stat_result], *, force_refresh: bool = False) -> bool:
+    if force_refresh:
+        return True
+    if session_id not in idx:
+        return True
+    try:
+        existing = _read_json(_INSIGHTS_SESSION_DIR / f"{session_id}.json")
+    except (OSError, json.JSONDecodeError):
+        return True
+    if validate_session_mechanism(existing):
+        return True
+    if existing.get("schema_version") != _SESSION_SCHEMA:
+        return True
+    return False
+
+
+def _json_loads(data: bytes) -> Dict:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# (dir mtime_ns, (records, by_week)) — reused across calls within one process.
+_SIDECAR_CACHE: List = [None, None]
+
+
+def _load_one_sidecar(path: Path) -> Optional[Dict]:
+    try:
+        return _json_loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+def _load_session_sidecars() -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+    """Load all sidecars; returns (records, records bucketed by week id)."""
+    if not _INSIGHTS_SESSION_DIR.is_dir():
+        return [], {}
+    dir_mtime = _INSIGHTS_SESSION_DIR.stat().st_mtime_ns
+    if _SIDECAR_CACHE[0] == dir_mtime and _SIDECAR_CACHE[1] is not None:
+        return _SIDECAR_CACHE[1]
+    paths = sorted(p for p in _INSIGHTS_SESSION_DIR.glob("*.json") if not p.name.startswith("."))
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        payloads = list(ex.map(_load_one_sidecar, paths))
+    records = [p for p in payloads if p is not None]
+    by_week: Dict[str, List[Dict]] = {}
+    for record in records:
+        by_week.setdefault(record.get("week", ""), []).append(record)
+    _SIDECAR_CACHE[0] = dir_mtime
+    _SIDECAR_CACHE[1] = (records, by_week)
+    return records, by_week
+
+
+def _filter_sessions_by_period(by_week: Dict[str, List[Dict]], since: Optional[str], until: Optional[str]) -> List[Dict]:
+    """Select records whose week falls in [since, until] via bucket keys.
+
+    Only the week keys inside the window are touched, so sidecars outside it
+    are never traversed.
+    """
+    keys = sorted(by_week)
+    lo = bisect.bisect_left(keys, since) if since else 0
+    hi = bisect.bisect_right(keys, until) if until else len(keys)
+    selected: List[Dict] = []
+    for week in keys[lo:hi]:
+        selected.extend(by_week[week])
+    return selected
+
+
+def _prepare_record(rec: _SessionRec, run_id: str, now_iso: str) -> Tuple[Optional[str], Optional[Dict], bytes]:
+    """Validate, default, and render one result item (CPU-only, picklable).
+
+    Returns (session_id, error, rendered_bytes); exactly one of session_id /
+    error is set. Runs in worker processes, so it must not touch disk.
+    """
+    validation_errors = validate_session_mechanism(rec.raw)
+    if validation_errors:
+        return None, {"session_id": rec.session_id, "errors": validation_errors}, b""
+
+    # Defaulting is attribute assignment on the slotted record; the raw dict
+    # is only written back once, right before rendering.
+    rec.schema_version = _SESSION_SCHEMA
+    if not rec.week:
+        rec.week = _week_from_timestamp(str(rec.raw.get("created_at", "")))
+    if not rec.period_id:
+        rec.period_id = rec.week
+    generated_by = rec.generated_by
+    if not isinstance(generated_by, dict):
+        generated_by = rec.generated_by = {}
+    generated_by.setdefault("run_id", run_id)
+    generated_by.setdefault("generated_at", now_iso)
+
+    record = rec.raw
+    record["schema_version"] = rec.schema_version
+    record["week"] = rec.week
+    record["period_id"] = rec.period_id
+    record["generated_by"] = generated_by
+
+    return rec.session_id, None, _render_record_bytes(record)
+
+
+_PARALLEL_MIN_ITEMS = 64
+
+
+def _apply_session_results(result_path: Path, run_id: str, raw_payload: Optional[Dict] = None) -> Tuple[int, int, List[Dict]]:
+    """Fan a raw result payload out into per-session sidecar files.
+
+    Returns (applied, skipped, errors). Validation and JSON rendering shard
+    across cores; only the disk writes stay in this process. Unchanged
+    records are detected via a content-hash index kept next to the sidecars
+    so they cost neither a read nor a write.
+    """
+    # Callers that just produced the result file can hand us the decoded
+    # payload and skip the resolve + re-read + re-decode round trip.
+    payload = raw_payload if raw_payload is not None else _read_json(result_path.expanduser().resolve())
+    items = _normalize_session_payload(payload)
+
+    run_dir = _RUNS_DIR / run_id
+    _ensured(str(run_dir))
+    _ensured(str(_INSIGHTS_SESSION_DIR))
+
+    # One timestamp per run: per-record sub-second jitter is meaningless and
+    # each _now_iso call costs a datetime build + format.
+    prepare = functools.partial(_prepare_record, run_id=run_id, now_iso=_now_iso())
+    if len(items) >= _PARALLEL_MIN_ITEMS:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+            prepared = list(ex.map(prepare, items, chunksize=64))
+    else:
+        prepared = [prepare(item) for item in items]
+
+    hash_index = _load_hash_index()
+    applied = 0
+    skipped = 0
+    errors: List[Dict] = []
+    dirty_names: List[str] = []
+    staging_dir = _INSIGHTS_SESSION_DIR / ".staging"
+    staging_dir.mkdir(exist_ok=True)
+    # Pass 1: write every dirty record into the staging dir (no fsync).
+    for session_id, error, rendered in prepared:
+        if error is not None:
+            errors.append(error)
+            continue
+
+        name = f"{session_id}.json"
+        record_hash = hashlib.blake2b(rendered, digest_size=16).hexdigest()
+        if hash_index.get(session_id) == record_hash and (_INSIGHTS_SESSION_DIR / name).exists():
+            skipped += 1
+            continue
+        _write_bytes(staging_dir / name, rendered)
+        dirty_names.append(name)
+        hash_index[session_id] = record_hash
+        applied += 1
+
+    # Pass 2: commit the batch with a tight rename loop — the kernel batches
+    # the metadata updates in page cache — then one optional directory fsync.
+    for name in dirty_names:
+        os.replace(staging_dir / name, _INSIGHTS_SESSION_DIR / name)
+    _fsync_dir(_INSIGHTS_SESSION_DIR)
+    _write_json(_HASH_INDEX_PATH, hash_index)
+    return applied, skipped, errors
+
+
+def _json_dumpb(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _render_record_bytes(record: Dict) -> bytes:
+    """Render a sidecar record as indented UTF-8 bytes, no str round trip."""
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_INDENT_2)
+    return json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _write_run_bundle(run_id: str, digests: List[Dict]) -> Path:
+    run_dir = _RUNS_DIR / run_id
+    _ensured(str(run_dir))
+    bundle_path = run_dir / "bundle.json"
+    # Stream the sessions array one digest at a time instead of materializing
+    # the whole bundle dict plus its serialized form; peak extra memory is one
+    # digest rather than the full run.
+    with open(bundle_path, "wb", buffering=1 << 20) as fh:
+        fh.write(b'{"run_id":%s,"generated_at":%s,"num_sessions":%d,"sessions":['
+                 % (_json_dumpb(run_id), _json_dumpb(_now_iso()), len(digests)))
+        for i, digest in enumerate(digests):
+            if i:
+                fh.write(b",")
+            fh.write(_json_dumpb(digest))
+        fh.write(b"]}")
+
+    hint_path = run_dir / "README.md"
+    hint_path.write_bytes(_README_TEMPLATE.format(run_id=run_id, n_sessions=len(digests)).encode("utf-8"))
+    return bundle_path
+
+
+def cmd_backfill(args: argparse.Namespace) -> int:
+    # Imported here so `--help`, `status`, and incremental runs don't pay the
+    # conversation-loader import cost.
+    from _sync_analysis_reports_core import build_session_digest, load_conversations, run_api
+
+    _ensure_dirs()
+    conversations = load_conversations()
+    sidecar_idx = _scan_sidecar_index()
+    target_conversations = []
+    for conv in conversations:
+        session_id = conv.get("session_id", "")
+        if not session_id:
+            continue
+        if _session_needs_backfill(session_id, sidecar_idx, force_refresh=args.force_refresh):
+            target_conversations.append(conv)
+    if args.limit:
+        target_conversations = target_conversations[: args.limit]
+    if not target_conversations:
+        print("backfill: nothing to do")
+        return 0
+
+    run_id = datetime.now(timezone.utc).strftime("backfill-%Y%m%dT%H%M%SZ")
+    if len(target_conversations) >= _PARALLEL_MIN_ITEMS:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+            digests = list(ex.map(build_session_digest, target_conversations, chunksize=32))
+    else:
+        digests = [build_session_digest(conv) for conv in target_conversations]
+    _write_run_bundle(run_id, digests)
+
+    result_path = _RUNS_DIR / run_id / "result.json"
+    run_api(digests, result_path)
+    raw_payload = _json_loads(result_path.read_bytes())
+    applied, skipped, errors = _apply_session_results(result_path, run_id, raw_payload=raw_payload)
+    print(f"backfill: applied={applied} skipped={skipped} errors={len(errors)}")
+    for err in errors:
+        print(f"  ! {err['session_id']}: {'; '.join(err['errors'])}", file=sys.stderr)
+    return 0 if not errors else 1
+
+
+def cmd_incremental(args: argparse.Namespace) -> int:
+    from _sync_analysis_reports_core import run_incremental_api
+
+    _ensure_dirs()
+    _, by_week = _load_session_sidecars()
+    windowed = _filter_sessions_by_period(by_week, args.since, args.until)
+    valid_sidecars = []
+    for item in windowed:
+        # Fast path: a record at the current schema with all required keys
+        # present skips the full validator.
+        if item.get("schema_version") == _SESSION_SCHEMA and _REQUIRED_KEYS <= item.keys():
+            valid_sidecars.append(item)
+            continue
+        errors = validate_session_mechanism(item)
+        if errors:
+            continue
+        valid_sidecars.append(item)
+    records = valid_sidecars
+    if not records:
+        print("incremental: no sidecars in window")
+        return 0
+
+    run_id = datetime.now(timezone.utc).strftime("incremental-%Y%m%dT%H%M%SZ")
+    run_dir = _RUNS_DIR / run_id
+    _ensured(str(run_dir))
+    result_path = run_dir / "result.json"
+    run_incremental_api(records, result_path)
+
+    from _sync_analysis_reports_core import sync_reports_from_incremental
+
+    num_reports = sync_reports_from_incremental(records, run_dir)
+    _write_run_bundle(run_id, records)
+    print(f"incremental: sessions={len(records)} reports={num_reports}")
+    return 0
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    sidecars, _ = _load_session_sidecars()
+    valid = sum(1 for item in sidecars if not validate_session_mechanism(item))
+    print(f"sidecars: {len(sidecars)} total, {valid} valid, {len(sidecars) - valid} invalid")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="sync_analysis_reports", description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_backfill = sub.add_parser("backfill", help="backfill missing/invalid session sidecars")
+    p_backfill.add_argument("--limit", type=int, default=0, help="cap sessions per run")
+    p_backfill.add_argument("--force-refresh", action="store_true", help="re-run even valid sidecars")
+    p_backfill.set_defaults(func=cmd_backfill)
+
+    p_incr = sub.add_parser("incremental", help="re-sync reports from existing sidecars")
+    p_incr.add_argument("--since", help="earliest week id, e.g. 2025-W01")
+    p_incr.add_argument("--until", help="latest week id, e.g. 2025-W10")
+    p_incr.set_defaults(func=cmd_incremental)
+
+    p_status = sub.add_parser("status", help="print sidecar counts")
+    p_status.set_defaults(func=cmd_status)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())